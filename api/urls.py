@@ -1,8 +1,20 @@
 from django.urls import path
-from .views.locations_views import search_location, fetch_location
+from .views.locations_views import search_location, fetch_location, batch_locations, location_snapshot, location_snapshot_file
+from .views.enterprises_views import employees_memberships, assets_memberships, enterprise_by_ruc
+from .views.assets_views import asset_by_code, assets_by_codes
 
 urlpatterns = [
   # locations
   path('v1/locations/search', search_location, name='search_location'),
+  path('v1/locations/batch', batch_locations, name='batch_locations'),
+  path('v1/locations/snapshot', location_snapshot, name='location_snapshot'),
+  path('v1/locations/snapshot/<str:digest>', location_snapshot_file, name='location_snapshot_file'),
   path('v1/locations/<str:district_id>', fetch_location, name='fetch_location'),
+  # enterprises
+  path('v1/enterprises/by-ruc/<str:ruc>', enterprise_by_ruc, name='enterprise_by_ruc'),
+  path('v1/employees/enterprises', employees_memberships, name='employees_memberships'),
+  path('v1/assets/enterprises', assets_memberships, name='assets_memberships'),
+  # assets
+  path('v1/assets/by-code', assets_by_codes, name='assets_by_codes'),
+  path('v1/assets/by-code/<str:code>', asset_by_code, name='asset_by_code'),
 ]
\ No newline at end of file
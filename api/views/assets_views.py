@@ -0,0 +1,42 @@
+# api/views/assets_views.py
+import json
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from management.services.asset_service import AssetService
+
+BATCH_MAX_CODES = 1000
+CODE_MAX_LENGTH = 50
+
+@require_GET
+def asset_by_code(request, code):
+  if len(code) > CODE_MAX_LENGTH:
+    return JsonResponse({'error': f'El código admite como máximo {CODE_MAX_LENGTH} caracteres'}, status=400)
+
+  try:
+    asset = AssetService.get_asset_by_code(code)
+    if not asset:
+      return JsonResponse({'error': 'Activo no encontrado'}, status=404)
+    return JsonResponse({'data': asset}, status=200)
+  except Exception as e:
+    return JsonResponse({'error': str(e)}, status=500)
+
+@csrf_exempt
+@require_POST
+def assets_by_codes(request):
+  try:
+    data = json.loads(request.body)
+    codes = data['codes']
+    if not isinstance(codes, list) or not all(isinstance(code, str) for code in codes):
+      raise ValueError('codes debe ser una lista de textos')
+  except Exception as e:
+    return JsonResponse({'error': str(e), 'message': 'Se esperaba {"codes": [...]}'}, status=400)
+
+  if len(codes) > BATCH_MAX_CODES:
+    return JsonResponse({'error': f'Máximo {BATCH_MAX_CODES} códigos por solicitud'}, status=400)
+
+  try:
+    found, not_found = AssetService.get_assets_by_codes(codes)
+    return JsonResponse({'data': found, 'not_found': not_found}, status=200)
+  except Exception as e:
+    return JsonResponse({'error': str(e)}, status=500)
@@ -0,0 +1,45 @@
+# api/views/enterprises_views.py
+import re
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from management.services.enterprise_service import EnterpriseService
+
+MEMBERSHIPS_MAX_IDS = 1000
+RUC_PATTERN = re.compile(r'^[0-9]{11}$')
+
+def _memberships_response(request, loader):
+  ids = [value for value in request.GET.get('ids', '').split(',') if value.strip()]
+  if not ids:
+    return JsonResponse({'error': 'Se esperaba ?ids=id1,id2,...'}, status=400)
+  if len(ids) > MEMBERSHIPS_MAX_IDS:
+    return JsonResponse({'error': f'Máximo {MEMBERSHIPS_MAX_IDS} IDs por solicitud'}, status=400)
+
+  try:
+    return JsonResponse({'data': loader(value.strip() for value in ids)}, status=200)
+  except Exception as e:
+    return JsonResponse({'error': str(e)}, status=500)
+
+@require_GET
+def employees_memberships(request):
+  return _memberships_response(request, EnterpriseService.get_employees_memberships)
+
+@require_GET
+def assets_memberships(request):
+  return _memberships_response(request, EnterpriseService.get_assets_memberships)
+
+@require_GET
+def enterprise_by_ruc(request, ruc):
+  if not RUC_PATTERN.match(ruc):
+    return JsonResponse({'error': 'El RUC debe tener 11 dígitos'}, status=400)
+
+  try:
+    enterprise = EnterpriseService.get_enterprise_by_tax_id(ruc)
+    if not enterprise:
+      return JsonResponse({'error': 'Empresa no encontrada'}, status=404)
+    data = enterprise.to_dict()
+    # Las listas de miembros pueden ser grandes; para eso está /employees/enterprises
+    data.pop('assetsIds')
+    data.pop('employeesIds')
+    return JsonResponse({'data': data}, status=200)
+  except Exception as e:
+    return JsonResponse({'error': str(e)}, status=500)
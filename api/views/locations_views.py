@@ -1,23 +1,91 @@
 # api/views/locations_views.py
-from django.http import JsonResponse
+import json
+from django.conf import settings
+from django.http import JsonResponse, FileResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, condition
 from bson import ObjectId
-from management.models.location import Location
+from main.decorators import versioned_cache
+from management.models.version_stamp import VersionStamp
+from management.services.location_index import LocationIndex
+from management.services.location_service import LocationService
+from management.services.location_snapshot import LocationSnapshot
 
+BATCH_MAX_IDS = 1000
+
+location_tree_cache = versioned_cache(
+  VersionStamp.location_tree,
+  'locations',
+  max_age=settings.LOCATIONS_CACHE_MAX_AGE,
+  stale_while_revalidate=settings.LOCATIONS_CACHE_STALE_WHILE_REVALIDATE
+)
+
+@location_tree_cache
 def search_location(request):
   name = request.GET.get('name', '')
   limit = int(request.GET.get('limit', 10))
   
   try:
-    results = list(Location.search_districts(name, limit))
+    results = LocationIndex.search_districts(name, limit)
     return JsonResponse({'data': results}, status=200)
   except Exception as e:
     return JsonResponse({'error': str(e)}, status=500)
 
+@location_tree_cache
 def fetch_location(request, district_id):
   try:
-    result = Location.get_district_with_hierarchy(ObjectId(district_id))
+    result = LocationService.get_district_with_hierarchy(ObjectId(district_id))
     if result:
       return JsonResponse({'data': result}, status=200)
     return JsonResponse({'error': 'Distrito no encontrado'}, status=404)
   except Exception as e:
-    return JsonResponse({'error': str(e), 'message': 'ID no válido'}, status=400)
\ No newline at end of file
+    return JsonResponse({'error': str(e), 'message': 'ID no válido'}, status=400)
+
+@csrf_exempt
+@require_POST
+def batch_locations(request):
+  try:
+    data = json.loads(request.body)
+    ids = data['ids']
+    if not isinstance(ids, list):
+      raise ValueError('ids debe ser una lista')
+  except Exception as e:
+    return JsonResponse({'error': str(e), 'message': 'Se esperaba {"ids": [...]}'}, status=400)
+
+  if len(ids) > BATCH_MAX_IDS:
+    return JsonResponse({'error': f'Máximo {BATCH_MAX_IDS} IDs por solicitud'}, status=400)
+
+  try:
+    found, not_found = LocationService.get_districts_with_hierarchy(ids)
+    return JsonResponse({'data': found, 'not_found': not_found}, status=200)
+  except Exception as e:
+    return JsonResponse({'error': str(e)}, status=500)
+
+
+@location_tree_cache
+def location_snapshot(request):
+  try:
+    manifest = LocationSnapshot.get_manifest()
+    return JsonResponse({'data': {
+      'version': manifest['version'],
+      'hash': manifest['hash'],
+      'url': reverse('location_snapshot_file', kwargs={'digest': manifest['hash']}),
+    }}, status=200)
+  except Exception as e:
+    return JsonResponse({'error': str(e)}, status=500)
+
+@condition(etag_func=lambda request, digest: digest)
+def location_snapshot_file(request, digest):
+  found = LocationSnapshot.find_file(digest, request.META.get('HTTP_ACCEPT_ENCODING', ''))
+  if not found:
+    return JsonResponse({'error': 'Snapshot no encontrado'}, status=404)
+
+  path, encoding = found
+  response = FileResponse(open(path, 'rb'), content_type='application/json; charset=utf-8')
+  if encoding:
+    response['Content-Encoding'] = encoding
+  patch_vary_headers(response, ['Accept-Encoding'])
+  patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+  return response
@@ -0,0 +1,52 @@
+# main/counting.py
+import hashlib
+from bson import json_util
+from django.conf import settings
+from django.core.cache import cache
+from management.models.version_stamp import VersionStamp
+
+def _count_key(collection_name, query):
+  # El filtro se normaliza con claves ordenadas para que el mismo filtro dé la misma clave
+  digest = hashlib.sha1(json_util.dumps(query, sort_keys=True).encode()).hexdigest()
+  return f'list_count:{collection_name}:{VersionStamp.current(collection_name)[0]}:{digest}'
+
+def count_documents(queryset):
+  """
+  Total para la paginación de un listado sin contar toda la colección en cada
+  request: sin filtros usa estimated_document_count (metadatos de la colección);
+  con filtros cuenta como máximo LIST_COUNT_LIMIT documentos y guarda el
+  resultado en la caché de Django durante LIST_COUNT_CACHE_TTL segundos, con la
+  versión compartida de la colección (VersionStamp) en la clave.
+  Args:
+    queryset (QuerySet): Consulta con los filtros del listado
+  Returns:
+    tuple: (total, exact) donde exact es False si el total llegó al tope
+  """
+  collection = queryset._document._get_collection()
+  query = queryset._query
+  if not query:
+    return collection.estimated_document_count(), True
+
+  key = _count_key(collection.name, query)
+  cached = cache.get(key)
+  if cached is not None:
+    return cached
+
+  limit = settings.LIST_COUNT_LIMIT
+  total = collection.count_documents(query, limit=limit + 1)
+  result = (min(total, limit), total <= limit)
+  cache.set(key, result, settings.LIST_COUNT_CACHE_TTL)
+  return result
+
+def invalidate_counts(model):
+  """
+  Descarta los totales en caché de una colección tras una escritura mediante
+  VersionStamp.collection_changed: el sello forma parte de las claves y las
+  anteriores expiran solas. Los demás procesos ven la nueva versión en
+  VERSION_STAMP_TTL segundos
+  """
+  VersionStamp.collection_changed(model)
+
+def count_label(total, exact):
+  """Total para mostrar: '1,000+' cuando el conteo llegó al tope"""
+  return str(total) if exact else f'{total:,}+'
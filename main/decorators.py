@@ -1,5 +1,7 @@
 from django.shortcuts import redirect
 from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 from functools import wraps
 
 def auth_required(view_func):
@@ -25,3 +27,30 @@ def auth_required_inverse(view_func):
       return redirect('home')  # nombre de la ruta principal
     return view_func(request, *args, **kwargs)
   return wrapper
+
+
+def versioned_cache(stamp_func, prefix, max_age=0, stale_while_revalidate=0):
+  """
+  Respuestas condicionales a partir de un sello de versión: ETag fuerte y
+  Last-Modified derivados de stamp_func() -> (version, updated), 304 si el
+  cliente ya tiene esa versión y Cache-Control público configurable.
+  """
+  def decorator(view_func):
+    conditional = condition(
+      etag_func=lambda request, *args, **kwargs: f'{prefix}-{stamp_func()[0]}',
+      last_modified_func=lambda request, *args, **kwargs: stamp_func()[1],
+    )(view_func)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+      response = conditional(request, *args, **kwargs)
+      if response.status_code in (200, 304, 404):
+        patch_cache_control(
+          response,
+          public=True,
+          max_age=max_age,
+          stale_while_revalidate=stale_while_revalidate
+        )
+      return response
+    return wrapper
+  return decorator
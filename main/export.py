@@ -0,0 +1,87 @@
+# main/export.py
+import csv
+import json
+from datetime import datetime
+from bson import ObjectId
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+FORMATS = {
+  'csv': 'text/csv; charset=utf-8',
+  'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+ROWS_PER_CHUNK = 500
+
+class _Echo:
+  """Pseudo-buffer para csv.writer: devuelve la línea escrita en vez de guardarla"""
+
+  def write(self, value):
+    return value
+
+def _export_value(value):
+  if isinstance(value, ObjectId):
+    return str(value)
+  if isinstance(value, datetime):
+    return value.isoformat()
+  return value
+
+def iter_export(queryset, fields, export_format='csv', batch_size=None):
+  """
+  Recorre el filtro de un QuerySet con un cursor pymongo crudo (sin construir
+  Documents), proyectando solo los campos exportados y ordenando por _id, que
+  siempre está indexado. Agrupa las filas en bloques para no emitir una
+  escritura por fila.
+  Args:
+    queryset (QuerySet): Consulta con los filtros de la vista
+    fields (tuple): Pares (campo en MongoDB, encabezado)
+    export_format (str): csv o ndjson
+    batch_size (int): Documentos por lote del cursor (EXPORT_BATCH_SIZE por defecto)
+  Returns:
+    generator: Bloques de texto
+  """
+  batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+  names = [name for name, _ in fields]
+  cursor = queryset._document._get_collection().find(
+    queryset._query,
+    {name: 1 for name in names},
+    sort=[('_id', 1)],
+    batch_size=batch_size
+  )
+
+  if export_format == 'csv':
+    writer = csv.writer(_Echo())
+    # BOM para que Excel reconozca UTF-8
+    yield '\ufeff' + writer.writerow([header for _, header in fields])
+    encode = lambda row: writer.writerow(['' if row.get(name) is None else _export_value(row.get(name)) for name in names])
+  else:
+    encode = lambda row: json.dumps(
+      {header: _export_value(row.get(name)) for name, header in fields}, ensure_ascii=False, default=str
+    ) + '\n'
+
+  try:
+    chunk = []
+    for row in cursor:
+      chunk.append(encode(row))
+      if len(chunk) >= ROWS_PER_CHUNK:
+        yield ''.join(chunk)
+        chunk = []
+    if chunk:
+      yield ''.join(chunk)
+  finally:
+    cursor.close()
+
+def export_response(queryset, fields, export_format, filename):
+  """
+  StreamingHttpResponse que empieza a enviar filas apenas llega el primer lote
+  Returns:
+    StreamingHttpResponse: o None si el formato no es válido
+  """
+  if export_format not in FORMATS:
+    return None
+  response = StreamingHttpResponse(
+    iter_export(queryset, fields, export_format), content_type=FORMATS[export_format]
+  )
+  stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+  response['Content-Disposition'] = f'attachment; filename="{filename}-{stamp}.{export_format}"'
+  response['Cache-Control'] = 'no-store'
+  return response
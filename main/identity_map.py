@@ -0,0 +1,67 @@
+# main/identity_map.py
+from contextvars import ContextVar
+
+_current = ContextVar('identity_map', default=None)
+
+class IdentityMap:
+  """
+  Mapa de identidad por request: un mismo documento se carga una sola vez por
+  request aunque varios servicios lo pidan por ID. Lo activa
+  IdentityMapMiddleware; fuera de un request los servicios consultan siempre.
+  """
+
+  def __init__(self):
+    self._documents = {}
+    self.hits = 0
+    self.misses = 0
+
+  @staticmethod
+  def _key(model, document_id):
+    return model.__name__, str(document_id)
+
+  @classmethod
+  def current(cls):
+    return _current.get()
+
+  @classmethod
+  def activate(cls):
+    identity_map = cls()
+    return identity_map, _current.set(identity_map)
+
+  @classmethod
+  def deactivate(cls, token):
+    _current.reset(token)
+
+  @classmethod
+  def load(cls, model, document_id, loader):
+    """
+    Devuelve el documento del mapa o lo carga con loader() y lo registra
+    Args:
+      model (type): Clase del documento
+      document_id (str|ObjectId): ID buscado
+      loader (callable): Consulta a ejecutar si el documento no está en el mapa
+    """
+    identity_map = _current.get()
+    if identity_map is None:
+      return loader()
+    key = cls._key(model, document_id)
+    if key in identity_map._documents:
+      identity_map.hits += 1
+      return identity_map._documents[key]
+    identity_map.misses += 1
+    document = loader()
+    if document is not None:
+      identity_map._documents[key] = document
+    return document
+
+  @classmethod
+  def add(cls, document):
+    identity_map = _current.get()
+    if identity_map is not None and document is not None:
+      identity_map._documents[cls._key(type(document), document.pk)] = document
+
+  @classmethod
+  def discard(cls, model, document_id):
+    identity_map = _current.get()
+    if identity_map is not None:
+      identity_map._documents.pop(cls._key(model, document_id), None)
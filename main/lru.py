@@ -0,0 +1,51 @@
+# main/lru.py
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class LRUCache:
+  """
+  Caché en memoria del proceso, acotada a max_size entradas (descarta la menos
+  usada) y con expiración de ttl segundos por entrada. Segura entre hilos. Cada
+  proceso tiene la suya: discard() solo invalida la del proceso actual y en los
+  demás la entrada vive como máximo ttl segundos.
+  """
+
+  def __init__(self, max_size, ttl):
+    self.max_size = max_size
+    self.ttl = ttl
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key, default=None):
+    with self._lock:
+      entry = self._entries.get(key, _MISSING)
+      if entry is _MISSING:
+        return default
+      value, expires = entry
+      if expires < time.monotonic():
+        del self._entries[key]
+        return default
+      self._entries.move_to_end(key)
+      return value
+
+  def set(self, key, value):
+    with self._lock:
+      self._entries[key] = (value, time.monotonic() + self.ttl)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_size:
+        self._entries.popitem(last=False)
+
+  def discard(self, *keys):
+    with self._lock:
+      for key in keys:
+        self._entries.pop(key, None)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+  def __len__(self):
+    return len(self._entries)
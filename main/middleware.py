@@ -0,0 +1,28 @@
+# main/middleware.py
+import logging
+from django.conf import settings
+from .identity_map import IdentityMap
+
+logger = logging.getLogger(__name__)
+
+class IdentityMapMiddleware:
+  """Activa un IdentityMap por request; con DEBUG informa las consultas ahorradas"""
+
+  def __init__(self, get_response):
+    self.get_response = get_response
+
+  def __call__(self, request):
+    identity_map, token = IdentityMap.activate()
+    try:
+      response = self.get_response(request)
+    finally:
+      IdentityMap.deactivate(token)
+
+    if settings.DEBUG:
+      response['X-Identity-Map'] = f'hits={identity_map.hits}; misses={identity_map.misses}'
+      if identity_map.hits:
+        logger.debug(
+          'IdentityMap %s: %d consultas ahorradas (%d cargadas)',
+          request.path, identity_map.hits, identity_map.misses
+        )
+    return response
@@ -0,0 +1,149 @@
+# main/pagination.py
+import base64
+import math
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.conf import settings
+
+EPOCH = datetime(1970, 1, 1)
+
+def encode_cursor(document):
+  """
+  Cursor opaco con la posición (created, _id) de un documento
+  Returns:
+    str: Token seguro para URL
+  """
+  millis = (document.created.replace(tzinfo=None) - EPOCH) // timedelta(milliseconds=1)
+  raw = f'{millis}:{document.id}'.encode()
+  return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token):
+  """
+  Returns:
+    tuple: (created, ObjectId) o None si el token no es válido
+  """
+  try:
+    raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+    millis, document_id = raw.split(':')
+    return EPOCH + timedelta(milliseconds=int(millis)), ObjectId(document_id)
+  except (ValueError, TypeError, InvalidId, UnicodeDecodeError):
+    return None
+
+def _keyset_filter(position, operator):
+  created, document_id = position
+  return {'$or': [
+    {'created': {operator: created}},
+    {'created': created, '_id': {operator: document_id}},
+  ]}
+
+def paginate(queryset, total, page_number=1, per_page=10, after='', before='', last=False, exact=True,
+             row_model=None):
+  """
+  Pagina por (created, _id) descendente. Las páginas superficiales
+  (hasta PAGINATION_MAX_SKIP_PAGE) usan skip; más allá la navegación sigue con
+  cursores after/before, que se resuelven con el índice (-created, -_id) sin
+  recorrer los documentos anteriores. En modo cursor page_number solo indica
+  la página para mostrarla; sin cursor se limita a PAGINATION_MAX_SKIP_PAGE.
+  Args:
+    queryset (QuerySet): Consulta con los filtros del listado
+    total (int): Total de documentos de la consulta
+    page_number (int): Página pedida o la que acompaña al cursor
+    per_page (int): Documentos por página
+    after (str): Cursor del último documento de la página anterior
+    before (str): Cursor del primer documento de la página siguiente
+    last (bool): Ir a la última página sin skip
+    exact (bool): False si total es solo un mínimo (conteo con tope)
+    row_model (type): ListRow con los campos a proyectar; sin él se devuelven Documents
+  Returns:
+    dict: items, page_number, total_pages, exact, offset, previous y next (parámetros de URL o None)
+  """
+  max_skip_page = settings.PAGINATION_MAX_SKIP_PAGE
+  total_pages = math.ceil(total / per_page)
+  # Con un total aproximado se desconoce la última página: no se limita la página ni se salta al final
+  page_number = max(1, min(page_number, total_pages or 1) if exact else page_number)
+  last = last and exact
+  if row_model:
+    queryset = queryset.only(*row_model.__slots__).as_pymongo()
+  after = decode_cursor(after) if after else None
+  before = decode_cursor(before) if before else None
+
+  if last and total:
+    # Última página con orden ascendente: mismo tamaño que en la numeración por páginas
+    page_number = total_pages
+    limit = total - (total_pages - 1) * per_page
+    items = list(queryset.order_by('created', 'id').limit(limit))[::-1]
+    has_previous, has_next = total_pages > 1, False
+  elif after:
+    items = list(
+      queryset.filter(__raw__=_keyset_filter(after, '$lt')).order_by('-created', '-id').limit(per_page + 1)
+    )
+    has_previous, has_next = True, len(items) > per_page
+    items = items[:per_page]
+  elif before:
+    items = list(
+      queryset.filter(__raw__=_keyset_filter(before, '$gt')).order_by('created', 'id').limit(per_page + 1)
+    )
+    has_previous, has_next = len(items) > per_page, True
+    items = items[:per_page][::-1]
+  else:
+    # Sin cursor válido solo se llega con skip hasta PAGINATION_MAX_SKIP_PAGE: un ?page= más
+    # profundo (escrito a mano o guardado) muestra esa página en vez de recorrer los anteriores
+    page_number = min(page_number, max_skip_page)
+    offset = (page_number - 1) * per_page
+    items = list(queryset.order_by('-created', '-id').skip(offset).limit(per_page + 1))
+    has_previous, has_next = page_number > 1, len(items) > per_page
+    items = items[:per_page]
+
+  if row_model:
+    items = [row_model(row) for row in items]
+
+  previous_page = None
+  if has_previous and items:
+    if page_number - 1 <= max_skip_page:
+      previous_page = {'page': page_number - 1}
+    else:
+      previous_page = {'page': page_number - 1, 'before': encode_cursor(items[0])}
+  next_page = None
+  if has_next and items:
+    if page_number + 1 <= max_skip_page:
+      next_page = {'page': page_number + 1}
+    else:
+      next_page = {'page': page_number + 1, 'after': encode_cursor(items[-1])}
+
+  return {
+    'items': items,
+    'page_number': page_number,
+    'total_pages': total_pages,
+    'exact': exact,
+    'offset': (page_number - 1) * per_page,
+    'previous': previous_page,
+    'next': next_page,
+  }
+
+def page_links(result, filters):
+  """
+  Query strings de Primero, Anterior, Siguiente y Último conservando los filtros
+  Args:
+    result (dict): Resultado paginado (total_pages, total_exact, previous y next)
+    filters (dict): Filtros y per_page del listado
+  Returns:
+    dict: first, previous, next, last ('?...' o None si el enlace no aplica)
+  """
+  def query(params):
+    return '?' + urlencode({**filters, **params}) if params is not None else None
+
+  total_pages = result['total_pages']
+  on_first = result['previous'] is None
+  on_last = result['next'] is None or not result['total_exact']
+  if total_pages <= settings.PAGINATION_MAX_SKIP_PAGE:
+    last_page = {'page': total_pages}
+  else:
+    last_page = {'page': total_pages, 'last': 1}
+  return {
+    'first': None if on_first else query({'page': 1}),
+    'previous': query(result['previous']),
+    'next': query(result['next']),
+    'last': None if on_last else query(last_page),
+  }
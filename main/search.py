@@ -0,0 +1,36 @@
+# main/search.py
+import re
+from main.text import fold, tokenize
+
+SEARCH_NAME = 'search_name'
+SEARCH_TOKENS = 'search_tokens'
+
+def search_keys(*values):
+  """
+  Claves de búsqueda de un documento: el texto normalizado completo y sus palabras
+  sin repetir ('Núñez  Pérez' -> ('nunez perez', ['nunez', 'perez']))
+  Returns:
+    tuple: (search_name, search_tokens)
+  """
+  text = ' '.join(value for value in values if value)
+  return ' '.join(fold(text).split()), list(dict.fromkeys(tokenize(text)))
+
+def search_filter(value):
+  """
+  Filtro crudo sobre search_name y search_tokens: prefijo anclado del texto
+  completo o cada palabra buscada como prefijo de alguna palabra del documento
+  ('nu pe' encuentra 'Núñez Pérez'). La entrada se escapa, de modo que los regex
+  son siempre '^literal' y MongoDB los resuelve con rangos del índice.
+  Returns:
+    dict: Filtro para Q(__raw__=...) o None si no hay nada que buscar
+  """
+  phrase = ' '.join(fold(value).split())
+  if not phrase:
+    return None
+  branches = [{SEARCH_NAME: {'$regex': '^' + re.escape(phrase)}}]
+  tokens = list(dict.fromkeys(tokenize(value)))
+  if len(tokens) == 1:
+    branches.append({SEARCH_TOKENS: {'$regex': '^' + re.escape(tokens[0])}})
+  elif tokens:
+    branches.append({'$and': [{SEARCH_TOKENS: {'$regex': '^' + re.escape(token)}} for token in tokens]})
+  return {'$or': branches}
@@ -54,6 +54,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'main.middleware.IdentityMapMiddleware',
 ]
 
 ROOT_URLCONF = 'main.urls'
@@ -198,4 +199,26 @@ SESSION_COOKIE_NAME = 'mi_sesion'            # nombre de la cookie
 SESSION_COOKIE_HTTPONLY = True               # evita acceso por JS
 SESSION_COOKIE_SECURE = True                 # solo por HTTPS
 SESSION_COOKIE_AGE = 60 * 60 * 24            # 1 día (en segundos)
-SESSION_EXPIRE_AT_BROWSER_CLOSE = False      # mantener sesión después de cerrar navegador
\ No newline at end of file
+SESSION_EXPIRE_AT_BROWSER_CLOSE = False      # mantener sesión después de cerrar navegador
+
+# Cada cuánto se relee de MongoDB un sello de VersionStamp (árbol de ubicaciones, cachés por colección)
+VERSION_STAMP_TTL = int(os.getenv('VERSION_STAMP_TTL', 5))
+
+# Caché HTTP de la API de ubicaciones (segundos)
+LOCATIONS_CACHE_MAX_AGE = int(os.getenv('LOCATIONS_CACHE_MAX_AGE', 300))
+LOCATIONS_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv('LOCATIONS_CACHE_STALE_WHILE_REVALIDATE', 86400))
+# Directorio del snapshot estático del árbol de ubicaciones (autocompletado local)
+LOCATIONS_SNAPSHOT_DIR = os.getenv('LOCATIONS_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'snapshots'))
+
+# Documentos por lote del cursor en las exportaciones CSV/NDJSON
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 2000))
+# Últimas páginas navegables con skip; más allá los listados paginan con cursores (created, _id)
+PAGINATION_MAX_SKIP_PAGE = int(os.getenv('PAGINATION_MAX_SKIP_PAGE', 20))
+# Conteos de los listados filtrados: tope ("1,000+") y segundos en la caché de Django
+LIST_COUNT_LIMIT = int(os.getenv('LIST_COUNT_LIMIT', 1000))
+LIST_COUNT_CACHE_TTL = int(os.getenv('LIST_COUNT_CACHE_TTL', 60))
+# Caché por proceso de la búsqueda de activos por código (entradas y segundos). Sus claves llevan
+# el sello de la colección assets: cualquier alta, edición o baja de un activo la vacía por
+# completo en todos los procesos (en VERSION_STAMP_TTL segundos), no solo la entrada de ese código
+ASSET_CODE_CACHE_SIZE = int(os.getenv('ASSET_CODE_CACHE_SIZE', 10000))
+ASSET_CODE_CACHE_TTL = int(os.getenv('ASSET_CODE_CACHE_TTL', 60))
@@ -0,0 +1,19 @@
+import re
+import unicodedata
+
+_SEPARATORS = re.compile(r'[\W_]+')
+
+def fold(value):
+  """
+  Normaliza un texto para búsquedas: minúsculas y sin tildes ('Ancón' -> 'ancon')
+  """
+  if not value:
+    return ''
+  decomposed = unicodedata.normalize('NFKD', str(value))
+  return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+def tokenize(value):
+  """
+  Separa un texto normalizado en palabras ('San Juan-de Lurigancho' -> ['san', 'juan', 'de', 'lurigancho'])
+  """
+  return [token for token in _SEPARATORS.split(fold(value)) if token]
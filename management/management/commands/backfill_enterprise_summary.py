@@ -0,0 +1,40 @@
+# management/management/commands/backfill_enterprise_summary.py
+from bson import ObjectId
+from django.core.management.base import BaseCommand
+from pymongo import UpdateMany
+from management.models.enterprise import Enterprise
+from management.services.location_service import LocationService
+
+class Command(BaseCommand):
+  help = 'Recalcula employees_count, assets_count y location_label de todas las empresas'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--batch-size', type=int, default=1000)
+
+  def handle(self, *args, **options):
+    collection = Enterprise._get_collection()
+
+    # Contadores: una sola actualización en el servidor, sin traer las listas de miembros
+    result = collection.update_many({}, [{'$set': {
+      'employees_count': {'$size': {'$ifNull': ['$employees_ids', []]}},
+      'assets_count': {'$size': {'$ifNull': ['$assets_ids', []]}},
+    }}])
+
+    # Ubicación: un UpdateMany por distrito distinto, no por empresa
+    location_ids = collection.distinct('location_id')
+    found, not_found = LocationService.get_districts_with_hierarchy(location_ids)
+    operations = [
+      UpdateMany(
+        {'location_id': ObjectId(district['district_id'])},
+        {'$set': {'location_label': district['full_name']}}
+      )
+      for district in found.values()
+    ]
+    batch_size = options['batch_size']
+    for start in range(0, len(operations), batch_size):
+      collection.bulk_write(operations[start:start + batch_size], ordered=False)
+
+    self.stdout.write(self.style.SUCCESS(
+      f'{result.matched_count} empresas procesadas, {len(operations)} ubicaciones asignadas, '
+      f'{len(not_found)} ubicaciones sin distrito'
+    ))
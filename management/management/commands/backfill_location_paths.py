@@ -0,0 +1,34 @@
+# management/management/commands/backfill_location_paths.py
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+from management.models.location import Location
+from management.services.location_service import LocationService
+
+class Command(BaseCommand):
+  help = 'Calcula ancestors, department_name, province_name y path de todas las ubicaciones'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--batch-size', type=int, default=1000)
+
+  def handle(self, *args, **options):
+    batch_size = options['batch_size']
+    collection = Location._get_collection()
+    Location.ensure_indexes()
+
+    rows = collection.find({}, {'name': 1, 'type': 1, 'parent_id': 1})
+    materialized = Location.materialize_rows(rows)
+
+    operations = [
+      UpdateOne({'_id': location_id}, {'$set': fields})
+      for location_id, fields in materialized.items()
+    ]
+    modified = 0
+    for start in range(0, len(operations), batch_size):
+      result = collection.bulk_write(operations[start:start + batch_size], ordered=False)
+      modified += result.modified_count
+
+    LocationService.refresh_tree_caches()
+    orphans = sum(1 for fields in materialized.values() if fields['path'] is None)
+    self.stdout.write(self.style.SUCCESS(
+      f'{len(operations)} ubicaciones procesadas, {modified} actualizadas, {orphans} huérfanas'
+    ))
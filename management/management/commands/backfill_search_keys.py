@@ -0,0 +1,46 @@
+# management/management/commands/backfill_search_keys.py
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+from main.search import search_keys
+from management.models.asset import Asset
+from management.models.employee import Employee
+from management.models.role import Role
+from management.models.tag import Tag
+
+# Colección -> campos con los que clean() calcula search_name y search_tokens
+SOURCES = {
+  'assets': (Asset, ('name',)),
+  'employees': (Employee, ('names', 'last_names')),
+  'roles': (Role, ('name',)),
+  'tags': (Tag, ('name',)),
+}
+
+class Command(BaseCommand):
+  help = 'Calcula search_name y search_tokens de activos, empleados, roles y tags'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--only', choices=SOURCES.keys(), help='Procesar solo una colección')
+
+  def handle(self, *args, **options):
+    batch_size = options['batch_size']
+    for name, (model, fields) in SOURCES.items():
+      if options['only'] and options['only'] != name:
+        continue
+      model.ensure_indexes()
+      collection = model._get_collection()
+      operations = []
+      updated = 0
+      cursor = collection.find({}, {field: 1 for field in fields}, batch_size=batch_size)
+      for row in cursor:
+        search_name, search_tokens = search_keys(*(row.get(field) for field in fields))
+        operations.append(UpdateOne(
+          {'_id': row['_id']},
+          {'$set': {'search_name': search_name, 'search_tokens': search_tokens}}
+        ))
+        if len(operations) >= batch_size:
+          updated += collection.bulk_write(operations, ordered=False).modified_count
+          operations = []
+      if operations:
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+      self.stdout.write(self.style.SUCCESS(f'{name}: {updated} documentos actualizados'))
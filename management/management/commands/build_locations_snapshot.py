@@ -0,0 +1,16 @@
+# management/management/commands/build_locations_snapshot.py
+from django.core.management.base import BaseCommand
+from management.services.location_snapshot import LocationSnapshot, brotli
+from management.services.location_shared_tree import LocationSharedTree
+
+class Command(BaseCommand):
+  help = 'Regenera el snapshot estático (gzip/brotli) y el árbol binario compartido de ubicaciones'
+
+  def handle(self, *args, **options):
+    LocationSharedTree.build()
+    manifest = LocationSnapshot.build()
+    encodings = 'gzip, brotli' if brotli else 'gzip (instale brotli para .br)'
+    self.stdout.write(self.style.SUCCESS(
+      f"Snapshot {manifest['file']} (versión {manifest['version']}, {encodings}) "
+      f"y {LocationSharedTree.path().name} en {LocationSnapshot.directory()}"
+    ))
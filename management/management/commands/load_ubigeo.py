@@ -0,0 +1,120 @@
+# management/management/commands/load_ubigeo.py
+import csv
+from bson import ObjectId
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import UpdateOne
+from main.text import fold
+from management.models.location import Location
+from management.services.location_service import LocationService
+
+CODE_COLUMNS = ('ubigeo', 'id_ubigeo', 'codigo', 'cod_ubigeo')
+NAME_COLUMNS = {
+  'department': ('departamento', 'department'),
+  'province': ('provincia', 'province'),
+  'district': ('distrito', 'district'),
+}
+PARENT_TYPE = {'province': 'department', 'district': 'province'}
+
+class Command(BaseCommand):
+  help = 'Carga o actualiza el catálogo UBIGEO del INEI (departamentos, provincias y distritos) desde un CSV'
+
+  def add_arguments(self, parser):
+    parser.add_argument('csv_path', help='CSV con columnas ubigeo, departamento, provincia y distrito')
+    parser.add_argument('--encoding', default='utf-8-sig')
+    parser.add_argument('--batch-size', type=int, default=1000)
+
+  def read_catalogue(self, csv_path, encoding):
+    """
+    Lee el CSV y deduce los tres niveles de cada código
+    Returns:
+      dict: código -> (tipo, nombre, código del padre o None)
+    """
+    try:
+      with open(csv_path, newline='', encoding=encoding) as f:
+        sample = f.read(4096)
+        f.seek(0)
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t|')
+        reader = csv.DictReader(f, dialect=dialect)
+        columns = {fold(name): name for name in reader.fieldnames or []}
+        code_column = next((columns[c] for c in CODE_COLUMNS if c in columns), None)
+        name_columns = {
+          location_type: next((columns[c] for c in candidates if c in columns), None)
+          for location_type, candidates in NAME_COLUMNS.items()
+        }
+        if not code_column or not all(name_columns.values()):
+          raise CommandError('El CSV debe tener las columnas ubigeo, departamento, provincia y distrito')
+
+        catalogue = {}
+        for line, row in enumerate(reader, start=2):
+          code = (row[code_column] or '').strip().zfill(6)
+          if not code.isdigit() or len(code) != 6:
+            raise CommandError(f'Línea {line}: código UBIGEO inválido {row[code_column]!r}')
+          levels = dict(zip(('department', 'province', 'district'), Location.ubigeo_levels(code)))
+          for location_type, level_code in levels.items():
+            name = (row[name_columns[location_type]] or '').strip()
+            if level_code and name and level_code not in catalogue:
+              parent_type = PARENT_TYPE.get(location_type)
+              catalogue[level_code] = (location_type, name, levels[parent_type] if parent_type else None)
+        return catalogue
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+      raise CommandError(f'No se pudo leer {csv_path}: {e}')
+
+  def handle(self, *args, **options):
+    catalogue = self.read_catalogue(options['csv_path'], options['encoding'])
+    batch_size = options['batch_size']
+    collection = Location._get_collection()
+    Location.ensure_indexes()
+
+    # Una sola lectura del árbol: las ubicaciones existentes se emparejan por
+    # código y, si aún no lo tienen, por tipo + nombre normalizado + padre
+    rows = {
+      row['_id']: row
+      for row in collection.find({}, {'name': 1, 'type': 1, 'parent_id': 1, 'ubigeo': 1})
+    }
+    by_code = {row['ubigeo']: row['_id'] for row in rows.values() if row.get('ubigeo')}
+    by_name = {}
+    for row in rows.values():
+      if not row.get('ubigeo'):
+        by_name.setdefault((row['type'], fold(row['name']), row.get('parent_id')), row['_id'])
+
+    # Los padres aparecen antes que sus hijos al ordenar por tipo y código
+    order = {'department': 0, 'province': 1, 'district': 2}
+    ids = {}
+    created = 0
+    for code, (location_type, name, parent_code) in sorted(
+      catalogue.items(), key=lambda item: (order[item[1][0]], item[0])
+    ):
+      parent_id = ids.get(parent_code)
+      location_id = by_code.get(code) or by_name.pop((location_type, fold(name), parent_id), None)
+      if location_id is None:
+        location_id = ObjectId()
+        created += 1
+        rows[location_id] = {'_id': location_id, 'name': name, 'type': location_type}
+      rows[location_id].update(parent_id=parent_id, ubigeo=code)
+      ids[code] = location_id
+
+    # Los nombres existentes se conservan; solo las ubicaciones nuevas toman el del catálogo
+    materialized = Location.materialize_rows(rows.values())
+    operations = [
+      UpdateOne(
+        {'_id': location_id},
+        {'$set': dict(
+          materialized[location_id],
+          name=rows[location_id]['name'],
+          type=rows[location_id]['type'],
+          parent_id=rows[location_id]['parent_id'],
+          ubigeo=code
+        )},
+        upsert=True
+      )
+      for code, location_id in ids.items()
+    ]
+    modified = 0
+    for start in range(0, len(operations), batch_size):
+      result = collection.bulk_write(operations[start:start + batch_size], ordered=False)
+      modified += result.modified_count
+
+    LocationService.refresh_tree_caches()
+    self.stdout.write(self.style.SUCCESS(
+      f'{len(operations)} códigos UBIGEO procesados: {created} ubicaciones nuevas, {modified} actualizadas'
+    ))
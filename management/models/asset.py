@@ -1,6 +1,7 @@
 from mongoengine import Document, EmbeddedDocument, ObjectIdField, StringField, DateTimeField, ListField, EmbeddedDocumentField
 from datetime import datetime
 from bson import ObjectId
+from main.search import search_keys
 from .document_embedded import DocumentEmbedded
 
 class Asset(Document):
@@ -9,6 +10,22 @@ class Asset(Document):
   """
   meta = {
     'collection': 'assets',
+    'indexes': [
+      # Orden de los listados y paginación por cursor (created, _id)
+      {
+        'fields': ['-created', '-id'],
+        'name': 'created_id_index'
+      },
+      # Búsqueda por nombre sin tildes ni mayúsculas (main.search)
+      {
+        'fields': ['search_name'],
+        'name': 'search_name_index'
+      },
+      {
+        'fields': ['search_tokens'],
+        'name': 'search_tokens_index'
+      }
+    ],
     'ordering': ['-created']
   }
 
@@ -19,9 +36,12 @@ class Asset(Document):
   documents = ListField(EmbeddedDocumentField(DocumentEmbedded))
   created = DateTimeField(default=datetime.utcnow)
   updated = DateTimeField(default=datetime.utcnow)
+  search_name = StringField(default='')
+  search_tokens = ListField(StringField())
 
   def clean(self):
     self.updated = datetime.utcnow()
+    self.search_name, self.search_tokens = search_keys(self.name)
 
   def __str__(self):
     return (
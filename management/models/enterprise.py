@@ -1,6 +1,7 @@
-from mongoengine import Document, ObjectIdField, StringField, DateTimeField, ListField
+from mongoengine import Document, ObjectIdField, StringField, DateTimeField, ListField, IntField
 from datetime import datetime
 from bson import ObjectId
+import re
 
 class Enterprise(Document):
   """
@@ -14,7 +15,12 @@ class Enterprise(Document):
       'email',
       'location_id',
       'assets_ids',
-      'employees_ids'
+      'employees_ids',
+      # Orden de los listados y paginación por cursor (created, _id)
+      {
+        'fields': ['-created', '-id'],
+        'name': 'created_id_index'
+      }
     ],
     'ordering': ['-created']
   }
@@ -25,12 +31,16 @@ class Enterprise(Document):
   tax_id = StringField(required=True, regex=r'^\d{11}$')
   fiscal_address = StringField(required=True, max_length=200)
   location_id = ObjectIdField(required=True)
+  location_label = StringField(max_length=310)  # 'Distrito, Provincia, Departamento', lo mantiene EnterpriseService
   phone = StringField(max_length=20)
   email = StringField(required=True, regex=r'^[^@]+@[^@]+\.[^@]+')
   website = StringField(regex=r'^https?://[^\s/$.?#].[^\s]*$')
   image_url = StringField(default='https://placehold.co/600x400/E0E0E0/333333?text=Sin+Imagen')
   assets_ids = ListField(ObjectIdField(), default=list)
   employees_ids = ListField(ObjectIdField(), default=list)
+  employees_count = IntField(default=0)  # len(employees_ids), lo mantiene EnterpriseService
+  assets_count = IntField(default=0)  # len(assets_ids)
+  version = IntField(default=0)  # Control optimista de las asociaciones
   created = DateTimeField(default=datetime.utcnow)
   updated = DateTimeField(default=datetime.utcnow)
 
@@ -49,12 +59,16 @@ class Enterprise(Document):
       'taxId': self.tax_id,
       'fiscalAddress': self.fiscal_address,
       'locationId': str(self.location_id),
+      'locationLabel': self.location_label,
       'phone': self.phone,
       'email': self.email,
       'website': self.website,
       'imageUrl': self.image_url,
       'assetsIds': [str(id) for id in self.assets_ids],
       'employeesIds': [str(id) for id in self.employees_ids],
+      'employeesCount': self.employees_count,
+      'assetsCount': self.assets_count,
+      'version': self.version,
       'created': self.created,
       'updated': self.updated
     }
@@ -64,4 +78,20 @@ class Enterprise(Document):
     try:
       return cls.objects.get(id=ObjectId(enterprise_id))
     except (cls.DoesNotExist, Exception):
-      return None
\ No newline at end of file
+      return None
+
+  @staticmethod
+  def tax_id_query(value):
+    """
+    Filtro por RUC que usa el índice tax_id: coincidencia exacta con 11 dígitos y
+    rango anclado [prefijo, prefijo siguiente) con menos dígitos ('2012' -> '2012' <= tax_id < '2013')
+    Returns:
+      dict: Filtro de MongoDB o None si el valor no es numérico
+    """
+    digits = re.sub(r'[\s.-]', '', value or '')
+    if not re.fullmatch(r'[0-9]{1,11}', digits):
+      return None
+    if len(digits) == 11:
+      return {'tax_id': digits}
+    upper = digits[:-1] + chr(ord(digits[-1]) + 1)
+    return {'tax_id': {'$gte': digits, '$lt': upper}}
\ No newline at end of file
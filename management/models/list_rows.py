@@ -0,0 +1,45 @@
+# management/models/list_rows.py
+
+class ListRow:
+  """
+  Fila de solo lectura para los listados. Se construye desde el dict de un cursor
+  as_pymongo() proyectado a los campos de __slots__, sin la validación, el
+  seguimiento de cambios ni los campos que el template no muestra (descripciones,
+  documentos embebidos, listas de miembros). 'created' se incluye siempre porque
+  la paginación por cursor lo necesita.
+  """
+  __slots__ = ()
+  # Valores para documentos antiguos que no tienen el campo guardado
+  DEFAULTS = {}
+
+  def __init__(self, row):
+    defaults = self.DEFAULTS
+    for name in self.__slots__:
+      setattr(self, name, row.get('_id' if name == 'id' else name, defaults.get(name)))
+
+  def __repr__(self):
+    return f'{type(self).__name__}({self.id})'
+
+class AssetRow(ListRow):
+  """Fila de templates/management/assets/list.html"""
+  __slots__ = ('id', 'code', 'name', 'created')
+
+class EmployeeRow(ListRow):
+  """Fila de templates/management/employees/list.html"""
+  __slots__ = ('id', 'names', 'last_names', 'email', 'user_id', 'created')
+
+class EnterpriseRow(ListRow):
+  """Fila de templates/management/enterprises/list.html"""
+  __slots__ = (
+    'id', 'business_name', 'trade_name', 'tax_id', 'location_label',
+    'employees_count', 'assets_count', 'created'
+  )
+  DEFAULTS = {'employees_count': 0, 'assets_count': 0}
+
+class RoleRow(ListRow):
+  """Fila de templates/management/roles/list.html"""
+  __slots__ = ('id', 'name', 'created')
+
+class TagRow(ListRow):
+  """Fila de templates/management/tags/list.html"""
+  __slots__ = ('id', 'name', 'created')
@@ -1,4 +1,4 @@
-from mongoengine import Document, StringField, ReferenceField
+from mongoengine import Document, StringField, ReferenceField, ListField, ObjectIdField
 from bson import ObjectId
 from mongoengine.queryset.visitor import Q
 
@@ -6,6 +6,13 @@ class Location(Document):
   name = StringField(required=True, max_length=100)
   type = StringField(required=True, choices=["department", "province", "district"])
   parent_id = ReferenceField('self', null=True)
+  # Ruta materializada: ancestros de la raíz hacia abajo y sus nombres
+  ancestors = ListField(ObjectIdField(), default=list)
+  department_name = StringField(max_length=100)
+  province_name = StringField(max_length=100)
+  path = StringField(max_length=310)  # 'Distrito, Provincia, Departamento'
+  # Código UBIGEO del INEI: '15' + '01' + '01'; departamentos y provincias completan con ceros
+  ubigeo = StringField(regex=r'^\d{6}$')
 
   meta = {
     'collection': 'locations',
@@ -22,10 +29,141 @@ class Location(Document):
       {
         'fields': ['parent_id'],
         'name': 'parent_id_index'
+      },
+      {
+        'fields': ['ancestors'],
+        'name': 'ancestors_index'
+      },
+      {
+        'fields': ['ubigeo'],
+        'name': 'ubigeo_index',
+        'unique': True,
+        'sparse': True
       }
     ]
   }
 
+  # Recalcula 'path' en el servidor a partir de los nombres materializados;
+  # si falta algún ancestro $concat devuelve null (ubicación huérfana)
+  PATH_EXPRESSION = {
+    "$switch": {
+      "branches": [
+        {
+          "case": {"$eq": ["$type", "district"]},
+          "then": {"$concat": ["$name", ", ", "$province_name", ", ", "$department_name"]}
+        },
+        {
+          "case": {"$eq": ["$type", "province"]},
+          "then": {"$concat": ["$name", ", ", "$department_name"]}
+        }
+      ],
+      "default": "$name"
+    }
+  }
+
+  HIERARCHY_PROJECTION = {
+    'name': 1, 'type': 1, 'department_name': 1, 'province_name': 1, 'path': 1
+  }
+
+  @staticmethod
+  def build_materialized(name, location_type, parent=None):
+    """
+    Calcula los campos materializados de una ubicación a partir de su padre
+    Args:
+      name (str): Nombre de la ubicación
+      location_type (str): department, province o district
+      parent (dict): Padre con _id, name, ancestors y department_name (o None)
+    Returns:
+      dict: ancestors, department_name, province_name y path
+    """
+    ancestors = []
+    department_name = None
+    province_name = None
+    if parent:
+      ancestors = list(parent.get('ancestors') or []) + [parent['_id']]
+      if location_type == 'province':
+        department_name = parent['name']
+      elif location_type == 'district':
+        department_name = parent.get('department_name')
+        province_name = parent['name']
+    return {
+      'ancestors': ancestors,
+      'department_name': department_name,
+      'province_name': province_name,
+      'path': Location.build_path(name, location_type, province_name, department_name),
+    }
+
+  @staticmethod
+  def ubigeo_levels(code):
+    """
+    Códigos UBIGEO de los tres niveles de un código ('150101' -> '150000', '150100', '150101')
+    Returns:
+      tuple: (departamento, provincia o None, distrito o None)
+    """
+    province = code[:4] + '00' if code[2:4] != '00' else None
+    district = code if code[4:] != '00' and province else None
+    return code[:2] + '0000', province, district
+
+  @staticmethod
+  def build_path(name, location_type, province_name=None, department_name=None):
+    """Equivalente en Python de PATH_EXPRESSION"""
+    if location_type == 'district':
+      parts = [name, province_name, department_name]
+    elif location_type == 'province':
+      parts = [name, department_name]
+    else:
+      parts = [name]
+    if any(part is None for part in parts):
+      return None
+    return ', '.join(parts)
+
+  @staticmethod
+  def materialize_rows(rows):
+    """
+    Calcula los campos materializados de todo el árbol (usado por el backfill)
+    Args:
+      rows (iterable): Documentos crudos con _id, name, type y parent_id
+    Returns:
+      dict: _id -> campos materializados
+    """
+    rows = list(rows)
+    by_id = {row['_id']: row for row in rows}
+    result = {}
+
+    def resolve(row, depth=0):
+      if row['_id'] in result:
+        return result[row['_id']]
+      parent_row = by_id.get(row.get('parent_id'))
+      parent = None
+      if parent_row and depth < 3:
+        parent = dict(parent_row, **resolve(parent_row, depth + 1))
+      fields = Location.build_materialized(row['name'], row['type'], parent)
+      result[row['_id']] = fields
+      return fields
+
+    for row in rows:
+      resolve(row)
+    return result
+
+  def to_materialized_parent(self):
+    return {
+      '_id': self.id,
+      'name': self.name,
+      'ancestors': self.ancestors,
+      'department_name': self.department_name,
+    }
+
+  @staticmethod
+  def district_result(row):
+    """Formato de respuesta de un distrito con su jerarquía"""
+    return {
+      'district_id': str(row['_id']),
+      'name': row['name'],
+      'province_name': row.get('province_name'),
+      'district_name': row['name'],
+      'full_name': row.get('path'),
+    }
+
   @classmethod
   def search_districts(cls, name, limit=10):
     """
@@ -37,65 +175,17 @@ class Location(Document):
       list: Lista de distritos con su jerarquía
     """
     pipeline = [
-      {"$match": {"type": "district"}},
-      {"$graphLookup": {
-        "from": "locations",
-        "startWith": "$parent_id",
-        "connectFromField": "parent_id",
-        "connectToField": "_id",
-        "as": "ancestors"
-      }},
-      {"$addFields": {
-        "province": {
-          "$first": {
-            "$map": {
-              "input": {
-                "$filter": {
-                  "input": "$ancestors",
-                  "as": "a",
-                  "cond": {"$eq": ["$$a.type", "province"]}
-                }
-              },
-              "as": "prov",
-              "in": "$$prov.name"
-            }
-          }
-        },
-        "department": {
-          "$first": {
-            "$map": {
-              "input": {
-                "$filter": {
-                  "input": "$ancestors",
-                  "as": "a",
-                  "cond": {"$eq": ["$$a.type", "department"]}
-                }
-              },
-              "as": "dep",
-              "in": "$$dep.name"
-            }
-          }
-        }
-      }},
-      {"$addFields": {
-        "full_name": {
-          "$concat": [
-            "$name", ", ",
-            "$province", ", ",
-            "$department"
-          ]
-        }
-      }},
       {"$match": {
-        "full_name": {"$regex": name, "$options": "i"}
+        "type": "district",
+        "path": {"$regex": name, "$options": "i"}
       }},
       {"$project": {
         "_id": 0,
         "district_id": {"$toString": "$_id"},
         "name": "$name",
-        "province_name": "$province",
+        "province_name": "$province_name",
         "district_name": "$name",
-        "full_name": 1  # Se agrega full_name con la concatenación
+        "full_name": "$path"
       }},
       {"$limit": limit}
     ]
@@ -104,91 +194,68 @@ class Location(Document):
   @classmethod
   def get_district_with_hierarchy(cls, district_id):
     """
-    Obtiene un distrito con su jerarquía completa
+    Obtiene un distrito con su jerarquía completa (lectura puntual por _id)
     Args:
       district_id (str|ObjectId): ID del distrito
     Returns:
       dict: Datos del distrito con su jerarquía
     """
-    pipeline = [
-      {
-        "$match": {
-          "_id": district_id,
-          "type": "district"
-        }
-      },
-      {
-        "$graphLookup": {
-          "from": "locations",
-          "startWith": "$parent_id",
-          "connectFromField": "parent_id",
-          "connectToField": "_id",
-          "as": "ancestors",
-          "maxDepth": 2
-        }
-      },
-      {
-        "$addFields": {
-          "province": {
-            "$arrayElemAt": [
-              {
-                "$filter": {
-                  "input": "$ancestors",
-                  "as": "a",
-                  "cond": {"$eq": ["$$a.type", "province"]}
-                }
-              },
-              0
-            ]
-          },
-          "department": {
-            "$arrayElemAt": [
-              {
-                "$filter": {
-                  "input": "$ancestors",
-                  "as": "a",
-                  "cond": {"$eq": ["$$a.type", "department"]}
-                }
-              },
-              0
-            ]
-          }
-        }
-      },
-      {
-        "$addFields": {
-          "full_name": {
-            "$concat": [
-              "$name", ", ",
-              "$province.name", ", ",
-              "$department.name"
-            ]
-          }
-        }
-      },
-      {
-        "$project": {
-          "_id": 0,
-          "district_id": {"$toString": "$_id"},
-          "name": "$name",
-          "province_name": "$province.name",
-          "district_name": "$name",
-          "full_name": 1  # Se agrega full_name con la concatenación
-        }
-      }
-    ]
     try:
-      result = cls.objects.aggregate(pipeline).next()
-      return result
-    except (StopIteration, Exception):
+      row = cls._get_collection().find_one(
+        {"_id": ObjectId(district_id), "type": "district"},
+        cls.HIERARCHY_PROJECTION
+      )
+    except Exception:
       return None
+    return cls.district_result(row) if row else None
 
-  def get_hierarchy(self):
+  @classmethod
+  def get_subtree(cls, location_id):
     """
-    Obtiene la jerarquía completa para la ubicación actual
+    Obtiene una ubicación y todos sus descendientes con un solo $graphLookup
+    Args:
+      location_id (str|ObjectId): ID de la raíz del subárbol
     Returns:
-      dict: Diccionario con la jerarquía
+      tuple: (raíz, descendientes ordenados por profundidad) como documentos crudos
+             con _id, name, type y parent_id, o None si la raíz no existe
     """
+    try:
+      location_id = ObjectId(location_id)
+    except Exception:
+      return None
+    pipeline = [
+      {"$match": {"_id": location_id}},
+      {"$graphLookup": {
+        "from": "locations",
+        "startWith": "$_id",
+        "connectFromField": "_id",
+        "connectToField": "parent_id",
+        "as": "descendants",
+        "maxDepth": 1,
+        "depthField": "depth"
+      }},
+      {"$project": {
+        "name": 1, "type": 1, "parent_id": 1,
+        "descendants._id": 1, "descendants.name": 1, "descendants.type": 1,
+        "descendants.parent_id": 1, "descendants.depth": 1
+      }}
+    ]
+    rows = list(cls._get_collection().aggregate(pipeline))
+    if not rows:
+      return None
+    root = rows[0]
+    descendants = sorted(root.pop('descendants'), key=lambda row: row['depth'])
+    return root, descendants
+
+  def has_materialized_hierarchy(self):
+    """Indica si los nombres de los ancestros ya están guardados en el documento"""
+    if self.type == 'province':
+      return self.department_name is not None
+    if self.type == 'district':
+      return self.department_name is not None and self.province_name is not None
+    return True
+
+  def build_hierarchy(self, department_name=None, province_name=None):
     if self.type == 'department':
       return {
         'department': self.name,
@@ -197,19 +264,61 @@ class Location(Document):
       }
     elif self.type == 'province':
       return {
-        'department': self.parent_id.name if self.parent_id else None,
+        'department': department_name,
         'province': self.name,
         'district': None
       }
     else:  # district
-      province = Location.objects.filter(
-        id=self.parent_id.id,
-        type='province'
-      ).first()
-      department = province.parent_id if province else None
-
       return {
-        'department': department.name if department else None,
-        'province': province.name if province else None,
+        'department': department_name,
+        'province': province_name,
         'district': self.name
       }
+
+  @classmethod
+  def get_hierarchies(cls, locations):
+    """
+    Obtiene la jerarquía de varias ubicaciones con un número fijo de consultas:
+    ninguna si tienen la ruta materializada y un solo $graphLookup para el resto.
+    Nunca desreferencia parent_id.
+    Args:
+      locations (iterable): Instancias de Location
+    Returns:
+      list: Diccionarios con la jerarquía, en el mismo orden recibido
+    """
+    locations = list(locations)
+    pending = [location.id for location in locations if not location.has_materialized_hierarchy()]
+
+    chains = {}
+    if pending:
+      pipeline = [
+        {"$match": {"_id": {"$in": pending}}},
+        {"$graphLookup": {
+          "from": "locations",
+          "startWith": "$parent_id",
+          "connectFromField": "parent_id",
+          "connectToField": "_id",
+          "as": "chain",
+          "maxDepth": 1
+        }},
+        {"$project": {"chain.type": 1, "chain.name": 1}}
+      ]
+      for row in cls._get_collection().aggregate(pipeline):
+        chains[row['_id']] = {ancestor['type']: ancestor['name'] for ancestor in row['chain']}
+
+    hierarchies = []
+    for location in locations:
+      if location.id in chains:
+        names = chains[location.id]
+        hierarchies.append(location.build_hierarchy(names.get('department'), names.get('province')))
+      else:
+        hierarchies.append(location.build_hierarchy(location.department_name, location.province_name))
+    return hierarchies
+
+  def get_hierarchy(self):
+    """
+    Obtiene la jerarquía completa para la ubicación actual
+    Returns:
+      dict: Diccionario con la jerarquía
+    """
+    return Location.get_hierarchies([self])[0]
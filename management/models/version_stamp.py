@@ -0,0 +1,66 @@
+from mongoengine import Document, StringField, IntField, DateTimeField
+from pymongo import ReturnDocument
+from datetime import datetime
+from django.conf import settings
+import time
+
+class VersionStamp(Document):
+  """
+  Sellos de versión compartidos por todos los procesos, un documento por nombre:
+  el árbol de ubicaciones (LOCATION_TREE) y cada colección cuyas cachés en memoria
+  se invalidan por versión. Se incrementan en cada escritura; las cachés llevan la
+  versión en sus claves y la API de ubicaciones la usa en ETag/Last-Modified.
+  """
+
+  meta = {
+    'collection': 'version_stamps'
+  }
+
+  LOCATION_TREE = 'location_tree'
+
+  id = StringField(primary_key=True)
+  version = IntField(default=0)
+  updated = DateTimeField(default=datetime.utcnow)
+
+  # Últimos sellos leídos en este proceso: nombre -> (version, updated, leído en)
+  _cached = {}
+
+  @classmethod
+  def bump(cls, name):
+    """Incrementa la versión del sello y la deja en la caché del proceso"""
+    row = cls._get_collection().find_one_and_update(
+      {'_id': name},
+      {'$inc': {'version': 1}, '$set': {'updated': datetime.utcnow().replace(microsecond=0)}},
+      upsert=True,
+      return_document=ReturnDocument.AFTER
+    )
+    cls._cached[name] = (row['version'], row['updated'], time.monotonic())
+    return row['version']
+
+  @classmethod
+  def current(cls, name):
+    """
+    Versión actual del sello, releída de MongoDB como máximo cada VERSION_STAMP_TTL segundos
+    Returns:
+      tuple: (version, updated) o (0, None) si nunca se ha incrementado
+    """
+    cached = cls._cached.get(name)
+    if cached and time.monotonic() - cached[2] < settings.VERSION_STAMP_TTL:
+      return cached[0], cached[1]
+    row = cls._get_collection().find_one({'_id': name}) or {}
+    cls._cached[name] = (row.get('version', 0), row.get('updated'), time.monotonic())
+    return cls._cached[name][0], cls._cached[name][1]
+
+  @classmethod
+  def collection_changed(cls, model):
+    """
+    Hook de escritura de una colección: incrementa su sello, que invalida en todos
+    los procesos las cachés que lo llevan en la clave (totales de los listados,
+    búsqueda de activos por código)
+    """
+    return cls.bump(model._get_collection_name())
+
+  @classmethod
+  def location_tree(cls):
+    """Sello del árbol de ubicaciones, sin argumentos para versioned_cache"""
+    return cls.current(cls.LOCATION_TREE)
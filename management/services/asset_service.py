@@ -3,14 +3,48 @@ from bson import ObjectId
 from mongoengine.queryset import Q
 from mongoengine.errors import DoesNotExist
 from datetime import datetime
-import math
+from django.conf import settings
+from main.counting import count_documents
+from main.identity_map import IdentityMap
+from main.lru import LRUCache
+from main.pagination import paginate
+from main.search import search_filter
 from management.models.asset import Asset
+from management.models.version_stamp import VersionStamp
+from management.models.list_rows import AssetRow
 from management.models.document_embedded import DocumentEmbedded
 
 class AssetService:
+  EXPORT_FIELDS = (
+    ('_id', 'id'), ('code', 'codigo'), ('name', 'nombre'), ('description', 'descripcion'),
+    ('created', 'creado'), ('updated', 'actualizado'),
+  )
+  # Proyección de la búsqueda por código: sin los documentos embebidos
+  CODE_LOOKUP_FIELDS = {'_id': 1, 'code': 1, 'name': 1, 'description': 1}
+  # código -> activo compacto, o None si el código no existe
+  _by_code = LRUCache(settings.ASSET_CODE_CACHE_SIZE, settings.ASSET_CODE_CACHE_TTL)
+
+  @staticmethod
+  def filter_assets(search_query='', code_query=''):
+    """Consulta de activos con los filtros del listado"""
+    assets = Asset.objects.all()
+    
+    query_list = []
+    name_filter = search_filter(search_query)
+    if name_filter:
+      query_list.append(Q(__raw__=name_filter))
+    if code_query:
+      query_list.append(Q(code__icontains=code_query))
+
+    if query_list:
+      combined_query = query_list[0]
+      for q in query_list[1:]:
+        combined_query &= q
+      assets = assets.filter(combined_query)
+    return assets
   
   @staticmethod
-  def get_assets_list(page_number=1, per_page=10, search_query='', code_query=''):
+  def get_assets_list(page_number=1, per_page=10, search_query='', code_query='', after='', before='', last=False):
     """Obtener lista paginada de activos con filtros"""
     try:
       page_number = int(page_number)
@@ -24,44 +58,109 @@ class AssetService:
     if per_page < 1:
       per_page = 10
 
-    assets = Asset.objects.all()
-    
-    query_list = []
-    if search_query:
-      query_list.append(Q(name__icontains=search_query) | Q(description__icontains=search_query))
-    if code_query:
-      query_list.append(Q(code__icontains=code_query))
+    assets = AssetService.filter_assets(search_query, code_query)
 
-    if query_list:
-      combined_query = query_list[0]
-      for q in query_list[1:]:
-        combined_query &= q
-      assets = assets.filter(combined_query)
-
-    total_assets = assets.count()
-    total_pages = math.ceil(total_assets / per_page)
-    
-    offset = (page_number - 1) * per_page
-    paginated_assets = assets.skip(offset).limit(per_page)
+    total_assets, exact = count_documents(assets)
+    page = paginate(
+      assets, total_assets, page_number, per_page, after, before, last, exact, AssetRow
+    )
 
     return {
-      'assets': paginated_assets,
+      'assets': page['items'],
       'total_assets': total_assets,
-      'total_pages': total_pages,
-      'page_number': page_number,
+      'total_exact': exact,
+      'total_pages': page['total_pages'],
+      'page_number': page['page_number'],
       'per_page': per_page,
-      'offset': offset
+      'offset': page['offset'],
+      'previous': page['previous'],
+      'next': page['next']
     }
   
   @staticmethod
   def get_asset_by_id(asset_id):
     """Obtener activo por ID"""
-    try:
-      return Asset.objects.get(id=ObjectId(asset_id))
-    except Asset.DoesNotExist:
-      return None
-    except Exception:
+    def load():
+      try:
+        return Asset.objects.get(id=ObjectId(asset_id))
+      except Asset.DoesNotExist:
+        return None
+      except Exception:
+        return None
+    return IdentityMap.load(Asset, asset_id, load)
+  
+  @staticmethod
+  def _code_lookup_dict(row):
+    return {
+      'id': str(row['_id']),
+      'code': row['code'],
+      'name': row.get('name'),
+      'description': row.get('description'),
+    }
+
+  @staticmethod
+  def _asset_changed():
+    """
+    Hook de cada alta, edición o baja de activos: incrementa el sello de la
+    colección, que vacía en todos los procesos la caché de búsqueda por código
+    (completa, no solo el código escrito) e invalida los totales de los listados
+    """
+    VersionStamp.collection_changed(Asset)
+
+  @staticmethod
+  def _code_cache_key(code):
+    # El sello que incrementa _asset_changed deja obsoletas las entradas de todos los procesos
+    return VersionStamp.current(Asset._get_collection_name())[0], code
+
+  @staticmethod
+  def get_asset_by_code(code):
+    """
+    Activo compacto por código para los lectores de etiquetas: se resuelve con el
+    índice único de code y se guarda en una caché LRU con TTL por proceso. Solo se
+    guardan los activos encontrados, de modo que un código recién dado de alta se
+    resuelve en la siguiente lectura
+    Returns:
+      dict: id, code, name y description, o None si no existe
+    """
+    key = AssetService._code_cache_key(code)
+    asset = AssetService._by_code.get(key)
+    if asset is not None:
+      return asset
+    row = Asset._get_collection().find_one({'code': code}, AssetService.CODE_LOOKUP_FIELDS)
+    if not row:
       return None
+    asset = AssetService._code_lookup_dict(row)
+    AssetService._by_code.set(key, asset)
+    return asset
+
+  @staticmethod
+  def get_assets_by_codes(codes):
+    """
+    Varios activos por código: los que no están en caché se leen con un solo $in
+    Returns:
+      tuple: (dict código -> activo, lista de códigos no encontrados)
+    """
+    codes = list(dict.fromkeys(codes))
+    found = {}
+    missing = []
+    for code in codes:
+      asset = AssetService._by_code.get(AssetService._code_cache_key(code))
+      if asset is None:
+        missing.append(code)
+      else:
+        found[code] = asset
+
+    if missing:
+      rows = Asset._get_collection().find(
+        {'code': {'$in': missing}}, AssetService.CODE_LOOKUP_FIELDS
+      )
+      for row in rows:
+        asset = AssetService._code_lookup_dict(row)
+        found[row['code']] = asset
+        AssetService._by_code.set(AssetService._code_cache_key(row['code']), asset)
+
+    not_found = [code for code in codes if code not in found]
+    return found, not_found
   
   @staticmethod
   def create_asset(name, description, code):
@@ -74,6 +173,7 @@ class AssetService:
         documents=[]
       )
       asset.save()
+      AssetService._asset_changed()
       return asset, None
     except Exception as e:
       return None, str(e)
@@ -90,6 +190,7 @@ class AssetService:
       asset.description = description
       asset.code = code
       asset.save()
+      AssetService._asset_changed()
       
       return asset, None
     except Exception as e:
@@ -105,50 +206,77 @@ class AssetService:
       
       asset_name = asset.name
       asset.delete()
+      AssetService._asset_changed()
+      IdentityMap.discard(Asset, asset_id)
       return True, asset_name
     except Exception as e:
       return False, str(e)
   
   @staticmethod
   def add_document_to_asset(asset_id, name, size, mime, url):
-    """Agregar documento a un activo"""
+    """
+    Agregar documento a un activo. No lee el activo: devuelve el documento
+    agregado, no el activo actualizado (usar get_asset_by_id si se necesita)
+    Returns:
+      tuple: (documento agregado, error)
+    """
+    documents, error = AssetService.add_documents_to_asset(
+      asset_id, [{'name': name, 'size': size, 'mime': mime, 'url': url}]
+    )
+    return (documents[0] if documents else None), error
+  
+  @staticmethod
+  def add_documents_to_asset(asset_id, documents_data):
+    """
+    Agregar varios documentos a un activo con un solo $push, sin leer ni reescribir
+    el activo completo
+    Args:
+      asset_id (str): ID del activo
+      documents_data (list): Dicts con name, size, mime y url
+    Returns:
+      tuple: (documentos agregados, error)
+    """
     try:
-      asset = AssetService.get_asset_by_id(asset_id)
-      if not asset:
-        return None, "Activo no encontrado"
-      
-      document = DocumentEmbedded(
-        name=name,
-        size=size,
-        mime=mime,
-        url=url
+      documents = [DocumentEmbedded(**data) for data in documents_data]
+      for document in documents:
+        document.validate()
+      if not documents:
+        return [], None
+
+      result = Asset._get_collection().update_one(
+        {'_id': ObjectId(asset_id)},
+        {
+          '$push': {'documents': {'$each': [document.to_mongo() for document in documents]}},
+          '$set': {'updated': datetime.utcnow()}
+        }
       )
-      
-      asset.documents.append(document)
-      asset.save()
-      return asset, None
+      if not result.matched_count:
+        return None, "Activo no encontrado"
+      IdentityMap.discard(Asset, asset_id)
+      return documents, None
     except Exception as e:
       return None, str(e)
   
   @staticmethod
   def delete_document_from_asset(asset_id, document_id):
-    """Eliminar documento de un activo"""
+    """Eliminar documento de un activo con un $pull por documents._id"""
     try:
-      asset = AssetService.get_asset_by_id(asset_id)
-      if not asset:
-        return False, "Activo no encontrado"
-      
-      document_to_delete = None
-      for doc in asset.documents:
-        if str(doc.id) == document_id:
-          document_to_delete = doc
-          break
-      
-      if not document_to_delete:
+      asset_id = ObjectId(asset_id)
+      document_id = ObjectId(document_id)
+      collection = Asset._get_collection()
+      result = collection.update_one(
+        {'_id': asset_id, 'documents._id': document_id},
+        {
+          '$pull': {'documents': {'_id': document_id}},
+          '$set': {'updated': datetime.utcnow()}
+        }
+      )
+      if not result.matched_count:
+        # Solo en el caso de error se distingue qué faltó
+        if not collection.count_documents({'_id': asset_id}, limit=1):
+          return False, "Activo no encontrado"
         return False, "Documento no encontrado"
-      
-      asset.documents.remove(document_to_delete)
-      asset.save()
+      IdentityMap.discard(Asset, asset_id)
       return True, None
     except Exception as e:
       return False, str(e)
\ No newline at end of file
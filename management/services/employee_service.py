@@ -3,13 +3,41 @@ from bson import ObjectId
 from mongoengine.queryset import Q
 from mongoengine.errors import DoesNotExist
 from datetime import datetime
-import math
+from main.counting import count_documents, invalidate_counts
+from main.identity_map import IdentityMap
+from main.pagination import paginate
+from main.search import search_filter
 from management.models.employee import Employee
+from management.models.list_rows import EmployeeRow
 
 class EmployeeService:
+  EXPORT_FIELDS = (
+    ('_id', 'id'), ('names', 'nombres'), ('last_names', 'apellidos'),
+    ('document_type', 'tipo_documento'), ('document_number', 'numero_documento'),
+    ('email', 'correo'), ('phone', 'telefono'), ('created', 'creado'), ('updated', 'actualizado'),
+  )
+
+  @staticmethod
+  def filter_employees(search_query='', email_query=''):
+    """Consulta de empleados con los filtros del listado"""
+    employees = Employee.objects.all()
+    
+    query_list = []
+    name_filter = search_filter(search_query)
+    if name_filter:
+      query_list.append(Q(__raw__=name_filter))
+    if email_query:
+      query_list.append(Q(email__icontains=email_query))
+
+    if query_list:
+      combined_query = query_list[0]
+      for q in query_list[1:]:
+        combined_query &= q
+      employees = employees.filter(combined_query)
+    return employees
   
   @staticmethod
-  def get_employees_list(page_number=1, per_page=10, search_query='', email_query=''):
+  def get_employees_list(page_number=1, per_page=10, search_query='', email_query='', after='', before='', last=False):
     """Obtener lista paginada de empleados con filtros"""
     try:
       page_number = int(page_number)
@@ -23,44 +51,36 @@ class EmployeeService:
     if per_page < 1:
       per_page = 10
 
-    employees = Employee.objects.all()
-    
-    query_list = []
-    if search_query:
-      query_list.append(Q(names__icontains=search_query) | Q(last_names__icontains=search_query))
-    if email_query:
-      query_list.append(Q(email__icontains=email_query))
+    employees = EmployeeService.filter_employees(search_query, email_query)
 
-    if query_list:
-      combined_query = query_list[0]
-      for q in query_list[1:]:
-        combined_query &= q
-      employees = employees.filter(combined_query)
-
-    total_employees = employees.count()
-    total_pages = math.ceil(total_employees / per_page)
-    
-    offset = (page_number - 1) * per_page
-    paginated_employees = employees.skip(offset).limit(per_page)
+    total_employees, exact = count_documents(employees)
+    page = paginate(
+      employees, total_employees, page_number, per_page, after, before, last, exact, EmployeeRow
+    )
 
     return {
-      'employees': paginated_employees,
+      'employees': page['items'],
       'total_employees': total_employees,
-      'total_pages': total_pages,
-      'page_number': page_number,
+      'total_exact': exact,
+      'total_pages': page['total_pages'],
+      'page_number': page['page_number'],
       'per_page': per_page,
-      'offset': offset
+      'offset': page['offset'],
+      'previous': page['previous'],
+      'next': page['next']
     }
   
   @staticmethod
   def get_employee_by_id(employee_id):
     """Obtener empleado por ID"""
-    try:
-      return Employee.objects.get(id=ObjectId(employee_id))
-    except Employee.DoesNotExist:
-      return None
-    except Exception:
-      return None
+    def load():
+      try:
+        return Employee.objects.get(id=ObjectId(employee_id))
+      except Employee.DoesNotExist:
+        return None
+      except Exception:
+        return None
+    return IdentityMap.load(Employee, employee_id, load)
   
   @staticmethod
   def create_employee(names, last_names, document_number, document_type, 
@@ -78,6 +98,7 @@ class EmployeeService:
         image_url=image_url
       )
       employee.save()
+      invalidate_counts(Employee)
       return employee, None
     except Exception as e:
       return None, str(e)
@@ -100,6 +121,7 @@ class EmployeeService:
       employee.user_id = user_id
       employee.image_url = str(image_url).strip() or '/user-default.png'
       employee.save()
+      invalidate_counts(Employee)
       
       return employee, None
     except Exception as e:
@@ -115,6 +137,8 @@ class EmployeeService:
       
       employee_name = employee.names
       employee.delete()
+      invalidate_counts(Employee)
+      IdentityMap.discard(Employee, employee_id)
       return True, employee_name
     except Exception as e:
       return False, str(e)
\ No newline at end of file
@@ -0,0 +1,255 @@
+# management/services/enterprise_import_service.py
+import csv
+import io
+from datetime import datetime
+from bson import ObjectId
+from django.core.exceptions import ValidationError
+from pymongo.errors import BulkWriteError
+from main.counting import invalidate_counts
+from main.text import fold
+from management.forms.enterprises_forms import EnterpriseForm
+from management.models.enterprise import Enterprise
+from management.services.location_service import LocationService
+
+try:
+  import openpyxl
+except ImportError:  # openpyxl es opcional: sin él solo se importan archivos CSV
+  openpyxl = None
+
+# Encabezados aceptados (normalizados con fold) para cada campo del formulario
+COLUMN_ALIASES = {
+  'business_name': ('razon social', 'razon_social', 'business_name'),
+  'trade_name': ('nombre comercial', 'nombre_comercial', 'trade_name'),
+  'tax_id': ('ruc', 'tax_id'),
+  'fiscal_address': ('direccion fiscal', 'direccion_fiscal', 'direccion', 'fiscal_address'),
+  'phone': ('telefono', 'phone'),
+  'email': ('correo', 'correo electronico', 'email'),
+  'website': ('sitio web', 'sitio_web', 'web', 'website'),
+  'location_id': ('location_id', 'id ubicacion'),
+  'ubigeo': ('ubigeo',),
+  'district': ('distrito', 'district'),
+  'province': ('provincia', 'province'),
+  'department': ('departamento', 'department'),
+}
+REQUIRED_COLUMNS = ('business_name', 'tax_id', 'fiscal_address', 'email')
+IGNORED_FORM_FIELDS = ('id', 'image_url', 'created', 'updated')
+MAX_REPORTED_ERRORS = 1000
+
+class EnterpriseImportService:
+  """
+  Importación masiva de empresas desde CSV o XLSX. Las filas se leen en streaming,
+  se validan con las reglas de EnterpriseForm, la ubicación se resuelve con los mapas en memoria
+  de LocationIndex (UBIGEO o nombres) y se insertan por lotes con
+  insert_many(ordered=False); en memoria solo queda el lote actual y los RUC vistos.
+  """
+
+  @staticmethod
+  def iter_rows(uploaded_file):
+    """
+    Lee el archivo fila por fila
+    Returns:
+      generator: (número de fila, dict encabezado normalizado -> valor)
+    """
+    name = (uploaded_file.name or '').lower()
+    if name.endswith('.xlsx'):
+      if not openpyxl:
+        raise ValueError('Instale openpyxl para importar archivos XLSX')
+      workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+      try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [fold(header) for header in next(rows, ())]
+        for number, values in enumerate(rows, start=2):
+          yield number, {
+            header: '' if value is None else str(value).strip()
+            for header, value in zip(headers, values)
+          }
+      finally:
+        workbook.close()
+    elif name.endswith('.csv'):
+      text = io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', newline='')
+      sample = text.read(4096)
+      text.seek(0)
+      try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t|')
+      except csv.Error:
+        dialect = csv.excel
+      reader = csv.reader(text, dialect)
+      headers = [fold(header) for header in next(reader, [])]
+      for number, values in enumerate(reader, start=2):
+        if any(values):
+          yield number, {header: value.strip() for header, value in zip(headers, values)}
+    else:
+      raise ValueError('Formato no soportado: use un archivo .csv o .xlsx')
+
+  @staticmethod
+  def map_columns(row):
+    """Traduce los encabezados del archivo a los campos del formulario"""
+    return {
+      field: next((row[alias] for alias in aliases if row.get(alias)), '')
+      for field, aliases in COLUMN_ALIASES.items()
+    }
+
+  @staticmethod
+  def resolve_location(data):
+    """
+    Ubicación por location_id, UBIGEO o distrito/provincia/departamento
+    Returns:
+      dict: Distrito con su jerarquía o None
+    """
+    if data['location_id']:
+      return LocationService.get_district_with_hierarchy(data['location_id'])
+    if data['ubigeo']:
+      return LocationService.get_district_by_ubigeo(data['ubigeo'])
+    if data['district'] and data['province'] and data['department']:
+      return LocationService.get_district_by_names(
+        data['district'], data['province'], data['department']
+      )
+    return None
+
+  @staticmethod
+  def get_validator():
+    """
+    Valida filas con las reglas de EnterpriseForm (RUC, correo, sitio web, largos)
+    usando una sola copia de sus campos: crear un formulario por fila copia todos
+    los campos y widgets, lo que domina el tiempo en archivos grandes.
+    Returns:
+      callable: data -> (datos limpios, errores por campo)
+    """
+    fields = {
+      name: field for name, field in EnterpriseForm().fields.items()
+      if name not in IGNORED_FORM_FIELDS
+    }
+
+    def validate(data):
+      cleaned = {}
+      errors = {}
+      for name, field in fields.items():
+        try:
+          cleaned[name] = field.clean(data.get(name, ''))
+        except ValidationError as e:
+          errors[name] = ' '.join(dict.fromkeys(e.messages))
+      return cleaned, errors
+    return validate
+
+  @staticmethod
+  def get_document_template():
+    """Documento con los valores por defecto de Enterprise, calculado una sola vez"""
+    template = Enterprise(
+      business_name='', tax_id='', fiscal_address='', location_id=ObjectId(), email=''
+    ).to_mongo().to_dict()
+    template.pop('_id')
+    return template
+
+  @staticmethod
+  def build_document(row, validate, template, seen_tax_ids):
+    """
+    Valida una fila y construye el documento a insertar
+    Returns:
+      tuple: (documento, errores por campo)
+    """
+    data = EnterpriseImportService.map_columns(row)
+    location = EnterpriseImportService.resolve_location(data)
+    if location:
+      data['location_id'] = location['district_id']
+    cleaned, errors = validate(data)
+    if not location:
+      errors['location_id'] = (
+        'Ubicación no encontrada (use location_id, ubigeo o distrito/provincia/departamento)'
+      )
+    if errors:
+      return None, errors
+
+    if cleaned['tax_id'] in seen_tax_ids:
+      return None, {'tax_id': f"RUC {cleaned['tax_id']} repetido en el archivo"}
+    seen_tax_ids.add(cleaned['tax_id'])
+
+    now = datetime.utcnow()
+    document = dict(template)
+    document.update(
+      _id=ObjectId(),
+      business_name=cleaned['business_name'],
+      trade_name=cleaned['trade_name'],
+      tax_id=cleaned['tax_id'],
+      fiscal_address=cleaned['fiscal_address'],
+      location_id=ObjectId(location['district_id']),
+      location_label=location['full_name'],
+      phone=cleaned['phone'],
+      email=cleaned['email'],
+      created=now,
+      updated=now,
+    )
+    if cleaned['website']:
+      document['website'] = cleaned['website']
+    return document, None
+
+  @staticmethod
+  def import_file(uploaded_file, chunk_size=1000):
+    """
+    Importa las empresas del archivo
+    Returns:
+      tuple: ({total, inserted, failed, errors: [{row, errors}]}, error)
+    """
+    report = {'total': 0, 'inserted': 0, 'failed': 0, 'errors': []}
+
+    def add_error(number, errors):
+      report['failed'] += 1
+      if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append({'row': number, 'errors': errors})
+
+    def flush(chunk):
+      # Los RUC ya registrados se descartan con una consulta indexada por lote
+      existing = {
+        row['tax_id'] for row in collection.find(
+          {'tax_id': {'$in': [document['tax_id'] for _, document in chunk]}}, {'tax_id': 1}
+        )
+      }
+      pending = []
+      for number, document in chunk:
+        if document['tax_id'] in existing:
+          add_error(number, {'tax_id': f"Ya existe una empresa con RUC {document['tax_id']}"})
+        else:
+          pending.append((number, document))
+      if not pending:
+        return
+      try:
+        result = collection.insert_many([document for _, document in pending], ordered=False)
+        report['inserted'] += len(result.inserted_ids)
+      except BulkWriteError as e:
+        report['inserted'] += e.details.get('nInserted', 0)
+        for write_error in e.details.get('writeErrors', []):
+          add_error(
+            pending[write_error['index']][0], {'__all__': write_error.get('errmsg', 'Error al insertar')}
+          )
+
+    try:
+      collection = Enterprise._get_collection()
+      validate = EnterpriseImportService.get_validator()
+      template = EnterpriseImportService.get_document_template()
+      seen_tax_ids = set()
+      chunk = []
+      for number, row in EnterpriseImportService.iter_rows(uploaded_file):
+        if not report['total']:
+          missing = [
+            field for field in REQUIRED_COLUMNS
+            if not any(alias in row for alias in COLUMN_ALIASES[field])
+          ]
+          if missing:
+            return None, f"Faltan columnas obligatorias: {', '.join(missing)}"
+        report['total'] += 1
+        document, errors = EnterpriseImportService.build_document(
+          row, validate, template, seen_tax_ids
+        )
+        if errors:
+          add_error(number, errors)
+          continue
+        chunk.append((number, document))
+        if len(chunk) >= chunk_size:
+          flush(chunk)
+          chunk = []
+      if chunk:
+        flush(chunk)
+      if report['inserted']:
+        invalidate_counts(Enterprise)
+      return report, None
+    except Exception as e:
+      return None, str(e)
@@ -1,68 +1,108 @@
 # management/services/enterprise_service.py
-import json
 from bson import ObjectId
 from mongoengine.queryset import Q
 from mongoengine.errors import DoesNotExist
+from pymongo import ReturnDocument
 from datetime import datetime
 import math
+from main.counting import count_documents, invalidate_counts
+from main.identity_map import IdentityMap
+from main.pagination import paginate
+from main.search import search_filter
 from management.models.enterprise import Enterprise
+from management.models.list_rows import EnterpriseRow
 from management.models.asset import Asset
 from management.models.employee import Employee
 from management.models.location import Location
+from management.services.location_service import LocationService
 
 class EnterpriseService:
   
+  VERSION_CONFLICT = 'La empresa fue modificada por otro usuario, recargue la página'
+  # Contador cacheado en la empresa para cada lista de miembros
+  COUNT_FIELDS = {'employees_ids': 'employees_count', 'assets_ids': 'assets_count'}
+  # Exporta los contadores y la ubicación desnormalizados, nunca las listas de miembros
+  EXPORT_FIELDS = (
+    ('_id', 'id'), ('tax_id', 'ruc'), ('business_name', 'razon_social'), ('trade_name', 'nombre_comercial'),
+    ('fiscal_address', 'direccion_fiscal'), ('location_label', 'ubicacion'), ('phone', 'telefono'),
+    ('email', 'correo'), ('website', 'sitio_web'), ('employees_count', 'empleados'),
+    ('assets_count', 'activos'), ('created', 'creado'), ('updated', 'actualizado'),
+  )
+  
   @staticmethod
-  def get_enterprises_list(page_number=1, per_page=10, search_query='', tax_id_query=''):
-    """Obtener lista paginada de empresas con filtros"""
-    try:
-      page_number = int(page_number)
-      per_page = int(per_page)
-    except (ValueError, TypeError):
-      page_number = 1
-      per_page = 10
-    
-    if page_number < 1:
-      page_number = 1
-    if per_page < 1:
-      per_page = 10
-
+  def filter_enterprises(search_query='', tax_id_query=''):
+    """Consulta de empresas con los filtros del listado"""
     enterprises = Enterprise.objects.all()
     
     query_list = []
     if search_query:
       query_list.append(Q(business_name__icontains=search_query) | Q(trade_name__icontains=search_query))
     if tax_id_query:
-      query_list.append(Q(tax_id__icontains=tax_id_query))
+      # Los RUC numéricos van por el índice; el regex sin anclar queda solo como respaldo
+      tax_id_filter = Enterprise.tax_id_query(tax_id_query)
+      if tax_id_filter:
+        query_list.append(Q(__raw__=tax_id_filter))
+      else:
+        query_list.append(Q(tax_id__icontains=tax_id_query))
 
     if query_list:
       combined_query = query_list[0]
       for q in query_list[1:]:
         combined_query &= q
       enterprises = enterprises.filter(combined_query)
+    return enterprises
 
-    total_enterprises = enterprises.count()
-    total_pages = math.ceil(total_enterprises / per_page)
+  @staticmethod
+  def get_enterprises_list(page_number=1, per_page=10, search_query='', tax_id_query='', after='', before='', last=False):
+    """Obtener lista paginada de empresas con filtros"""
+    try:
+      page_number = int(page_number)
+      per_page = int(per_page)
+    except (ValueError, TypeError):
+      page_number = 1
+      per_page = 10
     
-    offset = (page_number - 1) * per_page
-    paginated_enterprises = enterprises.skip(offset).limit(per_page)
+    if page_number < 1:
+      page_number = 1
+    if per_page < 1:
+      per_page = 10
+
+    enterprises = EnterpriseService.filter_enterprises(search_query, tax_id_query)
+
+    total_enterprises, exact = count_documents(enterprises)
+    page = paginate(
+      enterprises, total_enterprises, page_number, per_page, after, before, last, exact, EnterpriseRow
+    )
 
     return {
-      'enterprises': paginated_enterprises,
+      'enterprises': page['items'],
       'total_enterprises': total_enterprises,
-      'total_pages': total_pages,
-      'page_number': page_number,
+      'total_exact': exact,
+      'total_pages': page['total_pages'],
+      'page_number': page['page_number'],
       'per_page': per_page,
-      'offset': offset
+      'offset': page['offset'],
+      'previous': page['previous'],
+      'next': page['next']
     }
   
   @staticmethod
   def get_enterprise_by_id(enterprise_id):
     """Obtener empresa por ID"""
+    def load():
+      try:
+        return Enterprise.objects.get(id=ObjectId(enterprise_id))
+      except Enterprise.DoesNotExist:
+        return None
+      except Exception:
+        return None
+    return IdentityMap.load(Enterprise, enterprise_id, load)
+  
+  @staticmethod
+  def get_enterprise_by_tax_id(tax_id):
+    """Obtener empresa por RUC (coincidencia exacta sobre el índice tax_id), sin las listas de miembros"""
     try:
-      return Enterprise.objects.get(id=ObjectId(enterprise_id))
-    except Enterprise.DoesNotExist:
-      return None
+      return Enterprise.objects(tax_id=tax_id).exclude('assets_ids', 'employees_ids').first()
     except Exception:
       return None
   
@@ -77,12 +117,14 @@ class EnterpriseService:
         tax_id=tax_id,
         fiscal_address=fiscal_address,
         location_id=ObjectId(location_id),
+        location_label=EnterpriseService.get_location_label(location_id),
         phone=phone,
         email=email,
         website=website,
         image_url=image_url
       )
       enterprise.save()
+      invalidate_counts(Enterprise)
       return enterprise, None
     except Exception as e:
       return None, str(e)
@@ -101,11 +143,13 @@ class EnterpriseService:
       enterprise.tax_id = tax_id
       enterprise.fiscal_address = fiscal_address
       enterprise.location_id = ObjectId(location_id)
+      enterprise.location_label = EnterpriseService.get_location_label(location_id)
       enterprise.phone = phone
       enterprise.email = email
       enterprise.website = website
       enterprise.image_url = image_url
       enterprise.save()
+      invalidate_counts(Enterprise)
       
       return enterprise, None
     except Exception as e:
@@ -121,49 +165,104 @@ class EnterpriseService:
       
       enterprise_name = enterprise.business_name
       enterprise.delete()
+      invalidate_counts(Enterprise)
+      IdentityMap.discard(Enterprise, enterprise_id)
       return True, enterprise_name
     except Exception as e:
       return False, str(e)
   
+  @staticmethod
+  def _parse_pagination(page_number, per_page):
+    try:
+      page_number = int(page_number)
+      per_page = int(per_page)
+    except (ValueError, TypeError):
+      page_number = 1
+      per_page = 10
+    return max(page_number, 1), (per_page if per_page >= 1 else 10)
+  
+  @staticmethod
+  def _get_picker_page(queryset, associated_ids, fields, page_number, per_page):
+    """
+    Página del selector de asociaciones resuelta en una sola agregación: $facet
+    devuelve la página y el total, y 'associated' se calcula en el servidor con $in.
+    Args:
+      queryset (QuerySet): Consulta con los filtros del selector
+      associated_ids (list): IDs asociados actualmente a la empresa
+      fields (tuple): Campos a proyectar además del ID
+    Returns:
+      tuple: (filas de la página, total de coincidencias, offset)
+    """
+    offset = (page_number - 1) * per_page
+    projection = {'_id': 0, 'id': {'$toString': '$_id'}}
+    projection.update({field: 1 for field in fields})
+    projection['associated'] = {'$in': ['$_id', list(associated_ids)]}
+    pipeline = [
+      {'$match': queryset._query},
+      {'$sort': {'created': -1, '_id': -1}},
+      {'$facet': {
+        'page': [{'$skip': offset}, {'$limit': per_page}, {'$project': projection}],
+        'total': [{'$count': 'count'}]
+      }}
+    ]
+    result = next(queryset._document._get_collection().aggregate(pipeline), {})
+    total = result['total'][0]['count'] if result.get('total') else 0
+    return result.get('page', []), total, offset
+  
+  @staticmethod
+  def _filter_picker_employees(associated_ids, search_query='', email_query='', association_status='2'):
+    employees = Employee.objects.all()
+    
+    name_filter = search_filter(search_query)
+    if name_filter:
+      employees = employees.filter(__raw__=name_filter)
+    if email_query:
+      employees = employees.filter(email__icontains=email_query)
+    
+    if association_status == '1':
+      employees = employees.filter(id__in=associated_ids)
+    elif association_status == '0':
+      employees = employees.filter(id__nin=associated_ids)
+    return employees
+  
+  @staticmethod
+  def _filter_picker_assets(associated_ids, search_query='', code_query='', association_status='2'):
+    assets = Asset.objects.all()
+    
+    name_filter = search_filter(search_query)
+    if name_filter:
+      assets = assets.filter(__raw__=name_filter)
+    if code_query:
+      assets = assets.filter(code__icontains=code_query)
+    
+    if association_status == '1':
+      assets = assets.filter(id__in=associated_ids)
+    elif association_status == '0':
+      assets = assets.filter(id__nin=associated_ids)
+    return assets
+  
   @staticmethod
   def get_enterprise_employees(enterprise_id, page_number=1, per_page=10, 
                               search_query='', email_query='', association_status='2'):
     """Obtener empleados de una empresa con filtros"""
     try:
+      page_number, per_page = EnterpriseService._parse_pagination(page_number, per_page)
       enterprise = EnterpriseService.get_enterprise_by_id(enterprise_id)
       enterprise_employees_ids = enterprise.employees_ids or [] if enterprise else []
       
-      employees = Employee.objects.all()
-      
-      if search_query:
-        employees = employees.filter(Q(names__icontains=search_query) | Q(last_names__icontains=search_query))
-      if email_query:
-        employees = employees.filter(email__icontains=email_query)
-      
-      if association_status == '1':
-        employees = employees.filter(id__in=enterprise_employees_ids)
-      elif association_status == '0':
-        employees = employees.filter(id__nin=enterprise_employees_ids)
-      
-      employees_list = []
-      for employee in employees:
-        employees_list.append({
-          'id': str(employee.id),
-          'email': employee.email,
-          'names': employee.names,
-          'last_names': employee.last_names,
-          'associated': str(employee.id) in [str(aid) for aid in enterprise_employees_ids]
-        })
+      employees = EnterpriseService._filter_picker_employees(
+        enterprise_employees_ids, search_query, email_query, association_status
+      )
       
-      total_employees = len(employees_list)
-      total_pages = math.ceil(total_employees / per_page)
-      offset = (page_number - 1) * per_page
-      paginated_employees = employees_list[offset:offset + per_page]
+      paginated_employees, total_employees, offset = EnterpriseService._get_picker_page(
+        employees, enterprise_employees_ids, ('email', 'names', 'last_names'), page_number, per_page
+      )
       
       return {
         'employees': paginated_employees,
+        'version': enterprise.version if enterprise else 0,
         'total_employees': total_employees,
-        'total_pages': total_pages,
+        'total_pages': math.ceil(total_employees / per_page),
         'page_number': page_number,
         'per_page': per_page,
         'offset': offset
@@ -172,66 +271,53 @@ class EnterpriseService:
       return None, str(e)
   
   @staticmethod
-  def update_enterprise_employees(enterprise_id, employees_data):
+  def update_enterprise_employees(enterprise_id, employees_data, expected_version=None):
     """Actualizar empleados asociados a una empresa"""
-    try:
-      enterprise = EnterpriseService.get_enterprise_by_id(enterprise_id)
-      if not enterprise:
-        return False, "Empresa no encontrada"
-      
-      tmp = enterprise.employees_ids or []
-      for employee in employees_data:
-        selected = employee['selected']
-        employee_id = ObjectId(employee['id'])
-        if not selected and employee_id in tmp:
-          tmp.remove(employee_id)
-        if selected and employee_id not in tmp:
-          tmp.append(employee_id)
-      
-      enterprise.employees_ids = list(tmp)
-      enterprise.save()
-      return True, None
-    except Exception as e:
-      return False, str(e)
+    return EnterpriseService._update_associations(
+      enterprise_id, 'employees_ids', employees_data, expected_version
+    )
+  
+  @staticmethod
+  def update_matching_employees(enterprise_id, filters, selected, expected_version=None):
+    """
+    Asocia (o retira) todos los empleados que coinciden con los filtros del selector
+    Args:
+      filters (dict): name, email y association_status, como en get_enterprise_employees
+      selected (bool): True asocia, False retira
+    """
+    enterprise = EnterpriseService.get_enterprise_by_id(enterprise_id)
+    if not enterprise:
+      return None, "Empresa no encontrada"
+    employees = EnterpriseService._filter_picker_employees(
+      enterprise.employees_ids or [], filters.get('name', ''), filters.get('email', ''),
+      str(filters.get('association_status', '2'))
+    )
+    return EnterpriseService._update_matching_associations(
+      enterprise_id, 'employees_ids', employees, selected, expected_version
+    )
   
   @staticmethod
   def get_enterprise_assets(enterprise_id, page_number=1, per_page=10, 
                            search_query='', code_query='', association_status='2'):
     """Obtener activos de una empresa con filtros"""
     try:
+      page_number, per_page = EnterpriseService._parse_pagination(page_number, per_page)
       enterprise = EnterpriseService.get_enterprise_by_id(enterprise_id)
       enterprise_assets_ids = enterprise.assets_ids or [] if enterprise else []
       
-      assets = Asset.objects.all()
-      
-      if search_query:
-        assets = assets.filter(Q(name__icontains=search_query) | Q(description__icontains=search_query))
-      if code_query:
-        assets = assets.filter(code__icontains=code_query)
-      
-      if association_status == '1':
-        assets = assets.filter(id__in=enterprise_assets_ids)
-      elif association_status == '0':
-        assets = assets.filter(id__nin=enterprise_assets_ids)
-      
-      assets_list = []
-      for asset in assets:
-        assets_list.append({
-          'id': str(asset.id),
-          'code': asset.code,
-          'name': asset.name,
-          'associated': str(asset.id) in [str(aid) for aid in enterprise_assets_ids]
-        })
+      assets = EnterpriseService._filter_picker_assets(
+        enterprise_assets_ids, search_query, code_query, association_status
+      )
       
-      total_assets = len(assets_list)
-      total_pages = math.ceil(total_assets / per_page)
-      offset = (page_number - 1) * per_page
-      paginated_assets = assets_list[offset:offset + per_page]
+      paginated_assets, total_assets, offset = EnterpriseService._get_picker_page(
+        assets, enterprise_assets_ids, ('code', 'name'), page_number, per_page
+      )
       
       return {
         'assets': paginated_assets,
+        'version': enterprise.version if enterprise else 0,
         'total_assets': total_assets,
-        'total_pages': total_pages,
+        'total_pages': math.ceil(total_assets / per_page),
         'page_number': page_number,
         'per_page': per_page,
         'offset': offset
@@ -240,32 +326,192 @@ class EnterpriseService:
       return None, str(e)
   
   @staticmethod
-  def update_enterprise_assets(enterprise_id, assets_data):
+  def update_enterprise_assets(enterprise_id, assets_data, expected_version=None):
     """Actualizar activos asociados a una empresa"""
+    return EnterpriseService._update_associations(
+      enterprise_id, 'assets_ids', assets_data, expected_version
+    )
+  
+  @staticmethod
+  def update_matching_assets(enterprise_id, filters, selected, expected_version=None):
+    """
+    Asocia (o retira) todos los activos que coinciden con los filtros del selector
+    Args:
+      filters (dict): name, code y association_status, como en get_enterprise_assets
+      selected (bool): True asocia, False retira
+    """
+    enterprise = EnterpriseService.get_enterprise_by_id(enterprise_id)
+    if not enterprise:
+      return None, "Empresa no encontrada"
+    assets = EnterpriseService._filter_picker_assets(
+      enterprise.assets_ids or [], filters.get('name', ''), filters.get('code', ''),
+      str(filters.get('association_status', '2'))
+    )
+    return EnterpriseService._update_matching_associations(
+      enterprise_id, 'assets_ids', assets, selected, expected_version
+    )
+  
+  @staticmethod
+  def _update_associations(enterprise_id, field, items, expected_version=None):
+    """
+    Aplica la selección enviada como una diferencia atómica en un solo
+    find_one_and_update: retira los IDs deseleccionados y agrega los nuevos sin
+    reescribir la lista completa. $addToSet y $pull no pueden actuar sobre el
+    mismo campo en una actualización, así que se usa un pipeline equivalente.
+    Args:
+      field (str): employees_ids o assets_ids
+      items (list): [{'id': str, 'selected': bool}]
+      expected_version (int): Versión leída por el cliente; None omite el control
+    Returns:
+      tuple: ({'added', 'removed', 'version'}, error)
+    """
     try:
-      enterprise = EnterpriseService.get_enterprise_by_id(enterprise_id)
-      if not enterprise:
-        return False, "Empresa no encontrada"
-      
-      tmp = enterprise.assets_ids or []
-      for asset in assets_data:
-        selected = asset['selected']
-        asset_id = ObjectId(asset['id'])
-        if not selected and asset_id in tmp:
-          tmp.remove(asset_id)
-        if selected and asset_id not in tmp:
-          tmp.append(asset_id)
+      selection = {}
+      for item in items:
+        selection[ObjectId(item['id'])] = bool(item['selected'])
+      add = [item_id for item_id, selected in selection.items() if selected]
+      remove = [item_id for item_id, selected in selection.items() if not selected]
       
-      enterprise.assets_ids = list(tmp)
-      enterprise.save()
-      return True, None
+      update = EnterpriseService._association_pipeline(field, add, remove)
+      return EnterpriseService._apply_association_update(
+        enterprise_id, field, update, add, remove, expected_version
+      )
     except Exception as e:
-      return False, str(e)
+      return None, str(e)
+  
+  @staticmethod
+  def _update_matching_associations(enterprise_id, field, queryset, selected, expected_version=None):
+    """
+    Resuelve las coincidencias con un cursor que solo proyecta _id (sin construir
+    Documents) y las agrega o retira de la empresa en una sola actualización
+    Returns:
+      tuple: ({'added', 'removed', 'version'}, error)
+    """
+    try:
+      cursor = queryset._document._get_collection().find(
+        queryset._query, {'_id': 1}, batch_size=5000
+      )
+      matched = [row['_id'] for row in cursor]
+      add, remove = (matched, []) if selected else ([], matched)
+      return EnterpriseService._apply_association_update(
+        enterprise_id, field, EnterpriseService._association_pipeline(field, add, remove),
+        add, remove, expected_version
+      )
+    except Exception as e:
+      return None, str(e)
+  
+  @staticmethod
+  def _association_pipeline(field, add, remove):
+    """
+    Pipeline de actualización equivalente a $pull {$in: remove} seguido de
+    $addToSet {$each: add} (conserva el orden actual), que además recalcula el
+    contador de miembros y la versión en la misma escritura
+    """
+    return [
+      {'$set': {
+        field: {'$let': {
+          'vars': {'kept': {'$filter': {
+            'input': {'$ifNull': [f'${field}', []]},
+            'cond': {'$not': [{'$in': ['$$this', remove]}]}
+          }}},
+          'in': {'$concatArrays': ['$$kept', {'$filter': {
+            'input': {'$literal': add},
+            'cond': {'$not': [{'$in': ['$$this', '$$kept']}]}
+          }}]}
+        }},
+        'version': {'$add': [{'$ifNull': ['$version', 0]}, 1]},
+        'updated': datetime.utcnow()
+      }},
+      {'$set': {EnterpriseService.COUNT_FIELDS[field]: {'$size': f'${field}'}}}
+    ]
+  
+  @staticmethod
+  def _apply_association_update(enterprise_id, field, update, add, remove, expected_version=None):
+    """Ejecuta la actualización con el control de versión y cuenta los IDs agregados y retirados"""
+    query = {'_id': ObjectId(enterprise_id)}
+    if expected_version is not None:
+      expected_version = int(expected_version)
+      # Las empresas anteriores al campo version no lo tienen guardado
+      query['version'] = {'$in': [0, None]} if expected_version == 0 else expected_version
+    
+    collection = Enterprise._get_collection()
+    before = collection.find_one_and_update(
+      query, update, projection={field: 1, 'version': 1}, return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+      if expected_version is not None and collection.count_documents({'_id': query['_id']}, limit=1):
+        return None, EnterpriseService.VERSION_CONFLICT
+      return None, "Empresa no encontrada"
+    IdentityMap.discard(Enterprise, enterprise_id)
+    
+    previous = set(before.get(field) or [])
+    return {
+      'added': sum(1 for item_id in add if item_id not in previous),
+      'removed': sum(1 for item_id in remove if item_id in previous),
+      'version': (before.get('version') or 0) + 1
+    }, None
+  
+  @staticmethod
+  def get_employees_memberships(employee_ids):
+    """Empresas a las que pertenece cada empleado (ver _get_memberships)"""
+    return EnterpriseService._get_memberships('employees_ids', employee_ids)
+  
+  @staticmethod
+  def get_assets_memberships(asset_ids):
+    """Empresas a las que pertenece cada activo (ver _get_memberships)"""
+    return EnterpriseService._get_memberships('assets_ids', asset_ids)
+  
+  @staticmethod
+  def _get_memberships(field, member_ids):
+    """
+    Índice inverso de membresías resuelto con una sola consulta sobre el índice
+    multikey de la lista; de cada empresa solo se devuelven los IDs consultados,
+    no la lista completa de miembros.
+    Args:
+      field (str): employees_ids o assets_ids
+      member_ids (iterable): IDs de empleados o activos (los inválidos se ignoran)
+    Returns:
+      dict: ID del miembro -> lista de empresas {id, businessName, tradeName, taxId}
+    """
+    ids = [
+      ObjectId(member_id) for member_id in dict.fromkeys(map(str, member_ids))
+      if ObjectId.is_valid(member_id)
+    ]
+    memberships = {str(member_id): [] for member_id in ids}
+    if not ids:
+      return memberships
+    pipeline = [
+      {'$match': {field: {'$in': ids}}},
+      {'$sort': {'business_name': 1}},
+      {'$project': {
+        'business_name': 1, 'trade_name': 1, 'tax_id': 1,
+        'members': {'$setIntersection': [f'${field}', ids]}
+      }}
+    ]
+    for row in Enterprise._get_collection().aggregate(pipeline):
+      enterprise = {
+        'id': str(row['_id']),
+        'businessName': row['business_name'],
+        'tradeName': row.get('trade_name'),
+        'taxId': row['tax_id'],
+      }
+      for member_id in row['members']:
+        memberships[str(member_id)].append(enterprise)
+    return memberships
   
   @staticmethod
   def get_location_hierarchy(location_id):
     """Obtener jerarquía de ubicación"""
     try:
       return Location.get_district_with_hierarchy(location_id)
+    except Exception:
+      return None
+  
+  @staticmethod
+  def get_location_label(location_id):
+    """Texto 'Distrito, Provincia, Departamento' que se guarda en la empresa"""
+    try:
+      district = LocationService.get_district_with_hierarchy(location_id)
+      return district['full_name'] if district else None
     except Exception:
       return None
\ No newline at end of file
@@ -0,0 +1,116 @@
+# management/services/location_index.py
+import threading
+from management.models.location import Location
+from management.models.version_stamp import VersionStamp
+from management.services.location_search import LocationSearchEngine, district_entries, names_key
+from management.services.location_shared_tree import LocationSharedTree
+
+class LocationIndex:
+  """
+  Autocompletado de distritos y resolución de códigos UBIGEO del INEI y de nombres
+  (distrito, provincia, departamento) que traen las importaciones. Se sirven
+  directamente del archivo de LocationSharedTree, que todos los workers mapean en
+  memoria: el buscador y las búsquedas binarias leen sus tablas sin copiarlas, así
+  que no hay una copia del árbol por proceso. Solo si el archivo no está disponible
+  se construye un índice en memoria desde MongoDB, que se reconstruye cuando
+  cambia el sello del árbol (LocationService lo incrementa en cada escritura).
+  """
+  _lock = threading.Lock()
+  _built_version = -1
+  _engine = LocationSearchEngine(())
+  _by_ubigeo = {}
+  _by_names = {}
+
+  @classmethod
+  def version(cls):
+    return VersionStamp.location_tree()[0]
+
+  @classmethod
+  def invalidate(cls):
+    """Incrementa la versión del árbol; el archivo y los índices se regeneran en la siguiente consulta"""
+    return VersionStamp.bump(VersionStamp.LOCATION_TREE)
+
+  @staticmethod
+  def build_ubigeo_map(rows, districts):
+    """
+    Returns:
+      dict: Código UBIGEO -> resultado del distrito (solo distritos con jerarquía completa)
+    """
+    results = {result['district_id']: result for result, _ in districts}
+    return {
+      row['ubigeo']: results[str(row['_id'])]
+      for row in rows
+      if row.get('ubigeo') and str(row['_id']) in results
+    }
+
+  @staticmethod
+  def build_names_map(districts):
+    """
+    Returns:
+      dict: (distrito, provincia, departamento) normalizados -> resultado del distrito
+    """
+    return {
+      names_key(result['name'], result['province_name'], department_name): result
+      for result, department_name in districts
+    }
+
+  @classmethod
+  def _build_fallback(cls):
+    """Índice en memoria desde MongoDB, solo para cuando el archivo compartido no está disponible"""
+    version = cls.version()
+    if cls._built_version == version:
+      return
+    with cls._lock:
+      if cls._built_version != version:
+        rows = list(Location._get_collection().find(
+          {}, {'name': 1, 'type': 1, 'parent_id': 1, 'ubigeo': 1}
+        ))
+        districts = district_entries(rows)
+        cls._by_ubigeo = cls.build_ubigeo_map(rows, districts)
+        cls._by_names = cls.build_names_map(districts)
+        cls._engine = LocationSearchEngine(districts)
+        cls._built_version = version
+
+  @classmethod
+  def search_districts(cls, name, limit=10):
+    """
+    Busca distritos por nombre, provincia o departamento, ordenados por relevancia
+    Args:
+      name (str): Texto a buscar
+      limit (int): Límite de resultados
+    Returns:
+      list: Distritos con la misma forma que Location.search_districts
+    """
+    tree = LocationSharedTree.get()
+    if tree is not None:
+      return tree.search_engine.search(name, limit)
+    cls._build_fallback()
+    return cls._engine.search(name, limit)
+
+  @classmethod
+  def get_district_by_ubigeo(cls, code):
+    """
+    Distrito de un código UBIGEO de 6 dígitos
+    Returns:
+      dict: Distrito con la misma forma que Location.search_districts o None
+    """
+    code = str(code).strip().zfill(6)
+    tree = LocationSharedTree.get()
+    if tree is not None:
+      return tree.district_by_ubigeo(code)
+    cls._build_fallback()
+    return cls._by_ubigeo.get(code)
+
+  @classmethod
+  def get_district_by_names(cls, district, province, department):
+    """
+    Distrito por sus nombres, sin distinguir mayúsculas ni tildes
+    Returns:
+      dict: Distrito con la misma forma que Location.search_districts o None
+    """
+    key = names_key(district, province, department)
+    tree = LocationSharedTree.get()
+    if tree is not None:
+      return tree.district_by_names(key)
+    cls._build_fallback()
+    return cls._by_names.get(key)
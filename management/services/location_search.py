@@ -0,0 +1,249 @@
+# management/services/location_search.py
+import heapq
+from array import array
+from bisect import bisect_left
+from main.text import fold, tokenize
+
+# Palabras que no aportan al buscar si la consulta tiene otras
+STOPWORDS = frozenset(['de', 'del', 'la', 'las', 'los', 'el', 'y'])
+
+# Peso del campo donde coincide la palabra (distrito > provincia > departamento)
+FIELD_DISTRICT = 3
+FIELD_PROVINCE = 2
+FIELD_DEPARTMENT = 1
+
+# Peso del tipo de coincidencia (exacta > prefijo > aproximada)
+MATCH_EXACT = 3
+MATCH_PREFIX = 2
+MATCH_FUZZY = 1
+
+def trigrams(token):
+  """Trigramas con relleno inicial, así un prefijo comparte los trigramas de la palabra"""
+  padded = '$$' + token
+  return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def max_edits(token):
+  """Errores de tipeo tolerados según la longitud de la palabra"""
+  if len(token) < 4:
+    return 0
+  return 1 if len(token) < 8 else 2
+
+def bounded_levenshtein(a, b, max_distance):
+  """
+  Distancia de edición entre a y b, cortando en cuanto supera max_distance
+  Returns:
+    int: La distancia, o max_distance + 1 si es mayor
+  """
+  if abs(len(a) - len(b)) > max_distance:
+    return max_distance + 1
+  previous = list(range(len(b) + 1))
+  for i, char_a in enumerate(a, 1):
+    current = [i]
+    row_min = i
+    for j, char_b in enumerate(b, 1):
+      value = min(
+        previous[j] + 1,
+        current[j - 1] + 1,
+        previous[j - 1] + (char_a != char_b)
+      )
+      current.append(value)
+      if value < row_min:
+        row_min = value
+    if row_min > max_distance:
+      return max_distance + 1
+    previous = current
+  return previous[-1]
+
+def district_result(district_id, name, province_name, department_name):
+  """Resultado de un distrito con la misma forma que Location.search_districts"""
+  return {
+    'district_id': str(district_id),
+    'name': name,
+    'province_name': province_name,
+    'district_name': name,
+    'full_name': f'{name}, {province_name}, {department_name}',
+  }
+
+def district_entries(rows):
+  """
+  Distritos con jerarquía completa a partir de los documentos crudos del árbol
+  Args:
+    rows (iterable): Documentos con _id, name, type y parent_id
+  Returns:
+    tuple: Pares (resultado, nombre del departamento) en el orden de rows
+  """
+  rows = list(rows)
+  by_id = {row['_id']: row for row in rows}
+  districts = []
+  for row in rows:
+    if row.get('type') != 'district':
+      continue
+    province = by_id.get(row.get('parent_id'))
+    if not province or province.get('type') != 'province':
+      continue
+    department = by_id.get(province.get('parent_id'))
+    if not department or department.get('type') != 'department':
+      continue
+    districts.append((
+      district_result(row['_id'], row['name'], province['name'], department['name']),
+      department['name']
+    ))
+  return tuple(districts)
+
+def names_key(district, province, department):
+  """Clave (distrito, provincia, departamento) sin mayúsculas ni tildes"""
+  return fold(district), fold(province), fold(department)
+
+def index_tables(districts):
+  """
+  Tablas del índice de búsqueda: vocabulario ordenado para búsquedas por prefijo
+  con bisect y, por cada palabra, los distritos donde aparece con el mejor campo
+  Args:
+    districts (iterable): Pares (resultado, nombre del departamento)
+  Returns:
+    tuple: (palabras ordenadas, lista de (distritos, campos), trigrama -> posiciones
+           en el vocabulario, largo del nombre de cada distrito)
+  """
+  name_lengths = []
+  vocabulary = {}
+  for idx, (result, department_name) in enumerate(districts):
+    name_lengths.append(len(result['district_name']))
+    fields = (
+      (FIELD_DISTRICT, result['district_name']),
+      (FIELD_PROVINCE, result['province_name']),
+      (FIELD_DEPARTMENT, department_name),
+    )
+    for field, text in fields:
+      for token in tokenize(text):
+        postings = vocabulary.setdefault(token, {})
+        if postings.get(idx, 0) < field:
+          postings[idx] = field
+
+  tokens = sorted(vocabulary)
+  postings = []
+  trigram_positions = {}
+  for position, token in enumerate(tokens):
+    token_postings = vocabulary[token]
+    postings.append((array('I', token_postings.keys()), array('B', token_postings.values())))
+    for trigram in trigrams(token):
+      trigram_positions.setdefault(trigram, array('I')).append(position)
+  return tokens, postings, trigram_positions, array('H', name_lengths)
+
+class LocationSearchEngine:
+  """
+  Motor de autocompletado de distritos: ignora tildes y mayúsculas, coincide por
+  palabra completa, prefijo o con errores de tipeo acotados, y ordena por
+  relevancia. Es inmutable; se crea uno nuevo al cambiar el árbol.
+  """
+
+  def __init__(self, districts):
+    """
+    Args:
+      districts (iterable): Pares (resultado, nombre del departamento) en orden natural
+    """
+    districts = tuple(districts)
+    self._results = [result for result, _ in districts]
+    self._tokens, self._postings, self._trigrams, self._name_lengths = index_tables(districts)
+
+  @classmethod
+  def from_tables(cls, results, tokens, postings, trigram_positions, name_lengths):
+    """
+    Motor sobre tablas ya construidas, con la forma que devuelve index_tables
+    (LocationSharedTree las lee del archivo mapeado sin copiarlas)
+    Args:
+      results (sequence): Resultado de cada distrito por posición
+      tokens (sequence): Palabras ordenadas
+      postings (sequence): (distritos, campos) por posición en el vocabulario
+      trigram_positions: Objeto con get(trigrama, default) -> posiciones en el vocabulario
+      name_lengths (sequence): Largo del nombre de cada distrito
+    """
+    engine = cls.__new__(cls)
+    engine._results = results
+    engine._tokens = tokens
+    engine._postings = postings
+    engine._trigrams = trigram_positions
+    engine._name_lengths = name_lengths
+    return engine
+
+  def __len__(self):
+    return len(self._results)
+
+  def _match_token(self, token):
+    """
+    Palabras del vocabulario que coinciden con una palabra de la consulta
+    Yields:
+      tuple: (posición en el vocabulario, tipo de coincidencia, penalización)
+    """
+    matched = set()
+    position = bisect_left(self._tokens, token)
+    if position < len(self._tokens) and self._tokens[position] == token:
+      matched.add(position)
+      yield position, MATCH_EXACT, 0
+      position += 1
+    while position < len(self._tokens) and self._tokens[position].startswith(token):
+      matched.add(position)
+      yield position, MATCH_PREFIX, 0
+      position += 1
+
+    edits = max_edits(token)
+    if not edits:
+      return
+    query_trigrams = trigrams(token)
+    shared = {}
+    for trigram in query_trigrams:
+      for candidate in self._trigrams.get(trigram, ()):
+        shared[candidate] = shared.get(candidate, 0) + 1
+    threshold = max(1, len(query_trigrams) - 3 * edits)
+    for candidate, count in shared.items():
+      if count < threshold or candidate in matched:
+        continue
+      word = self._tokens[candidate]
+      distance = bounded_levenshtein(token, word, edits)
+      if distance > edits and len(word) > len(token):
+        distance = bounded_levenshtein(token, word[:len(token)], edits)
+      if distance <= edits:
+        yield candidate, MATCH_FUZZY, distance
+
+  def search(self, query, limit=10):
+    """
+    Busca distritos ordenados por relevancia
+    Args:
+      query (str): Texto ingresado por el usuario
+      limit (int): Límite de resultados
+    Returns:
+      list: Copias de los resultados más relevantes
+    """
+    if limit <= 0:
+      return []
+    tokens = tokenize(query)
+    if len(tokens) > 1:
+      tokens = [token for token in tokens if token not in STOPWORDS] or tokens
+    if not tokens:
+      return [dict(result) for result in self._results[:limit]]
+
+    # idx -> [palabras de la consulta que coinciden, puntaje acumulado]
+    matched = {}
+    for token in dict.fromkeys(tokens):
+      best = {}
+      for position, kind, penalty in self._match_token(token):
+        keys, fields = self._postings[position]
+        base = kind * 10 - penalty
+        for idx, field in zip(keys, fields):
+          score = base + field
+          if score > best.get(idx, 0):
+            best[idx] = score
+      for idx, score in best.items():
+        entry = matched.get(idx)
+        if entry is None:
+          matched[idx] = [1, score]
+        else:
+          entry[0] += 1
+          entry[1] += score
+
+    name_lengths = self._name_lengths
+    ranked = heapq.nsmallest(
+      limit,
+      matched.items(),
+      key=lambda item: (-item[1][0], -item[1][1], name_lengths[item[0]], item[0])
+    )
+    return [dict(self._results[idx]) for idx, _ in ranked]
@@ -1,7 +1,13 @@
 # management/services/locations_service.py
 from bson import ObjectId
 from mongoengine.errors import DoesNotExist
+from pymongo import UpdateOne, UpdateMany
+from main.identity_map import IdentityMap
 from management.models.location import Location
+from management.models.enterprise import Enterprise
+from management.services.location_index import LocationIndex
+from management.services.location_snapshot import LocationSnapshot
+from management.services.location_shared_tree import LocationSharedTree
 
 class LocationService:
   
@@ -11,10 +17,12 @@ class LocationService:
   
   @staticmethod
   def get_location_by_id(location_id):
-    try:
-      return Location.objects.get(id=ObjectId(location_id))
-    except (DoesNotExist, Exception):
-      return None
+    def load():
+      try:
+        return Location.objects.get(id=ObjectId(location_id))
+      except (DoesNotExist, Exception):
+        return None
+    return IdentityMap.load(Location, location_id, load)
   
   @staticmethod
   def get_provinces_by_department(department_id):
@@ -30,15 +38,79 @@ class LocationService:
       return Location.objects.filter(type="district", parent_id=province.id)
     return []
   
+  @staticmethod
+  def get_district_with_hierarchy(district_id):
+    """Obtiene un distrito con su jerarquía desde el árbol compartido (o MongoDB si no está disponible)"""
+    tree = LocationSharedTree.get()
+    if tree is not None:
+      return tree.district_result(district_id)
+    return Location.get_district_with_hierarchy(district_id)
+  
+  @staticmethod
+  def get_district_by_ubigeo(code):
+    """Obtiene un distrito con su jerarquía a partir de su código UBIGEO (índice en memoria)"""
+    return LocationIndex.get_district_by_ubigeo(code)
+  
+  @staticmethod
+  def get_district_by_names(district, province, department):
+    """Obtiene un distrito con su jerarquía a partir de sus nombres (índice en memoria)"""
+    return LocationIndex.get_district_by_names(district, province, department)
+  
+  @staticmethod
+  def get_districts_with_hierarchy(district_ids):
+    """
+    Obtiene la jerarquía de varios distritos desde el árbol compartido o, si no
+    está disponible, con una sola consulta $in
+    Args:
+      district_ids (iterable): IDs de distritos (str u ObjectId), con o sin repetidos
+    Returns:
+      tuple: (dict id -> distrito con jerarquía, lista de IDs no encontrados o inválidos)
+    """
+    requested = []
+    not_found = []
+    for district_id in dict.fromkeys(str(district_id) for district_id in district_ids):
+      if ObjectId.is_valid(district_id):
+        requested.append(ObjectId(district_id))
+      else:
+        not_found.append(district_id)
+    
+    found = {}
+    tree = LocationSharedTree.get() if requested else None
+    if tree is not None:
+      for district_id in requested:
+        result = tree.district_result(district_id)
+        if result:
+          found[str(district_id)] = result
+    elif requested:
+      rows = Location._get_collection().find(
+        {'_id': {'$in': requested}, 'type': 'district'},
+        Location.HIERARCHY_PROJECTION
+      )
+      for row in rows:
+        found[str(row['_id'])] = Location.district_result(row)
+    
+    not_found.extend(str(district_id) for district_id in requested if str(district_id) not in found)
+    return found, not_found
+  
   @staticmethod
   def create_location(name, location_type, parent_id=None):
     try:
+      parent = None
+      if parent_id:
+        parent = LocationService.get_location_by_id(parent_id)
+        if not parent:
+          return None, "Parent no encontrado"
       location = Location(
         name=name,
         type=location_type,
-        parent_id=parent_id
+        parent_id=parent,
+        **Location.build_materialized(
+          name, location_type, parent.to_materialized_parent() if parent else None
+        )
       )
       location.save()
+      IdentityMap.add(location)
+      LocationService._tree_changed()
       return location, None
     except Exception as e:
       return None, str(e)
@@ -49,22 +121,149 @@ class LocationService:
       location = LocationService.get_location_by_id(location_id)
       if location:
         location.name = name
+        location.path = Location.build_path(
+          name, location.type, location.province_name, location.department_name
+        )
         location.save()
+        # Propaga el nuevo nombre a los descendientes en una sola operación
+        name_field = LocationService._descendant_name_field(location.type)
+        if name_field:
+          Location._get_collection().update_many(
+            {'ancestors': location.id},
+            [{'$set': {name_field: name}}, {'$set': {'path': Location.PATH_EXPRESSION}}]
+          )
+        LocationService._refresh_enterprise_labels(location.id)
+        LocationService._tree_changed()
         return location, None
       return None, "Ubicación no encontrada"
     except Exception as e:
       return None, str(e)
   
+  @staticmethod
+  def count_enterprises_using(location_ids):
+    """Cantidad de empresas cuya ubicación está en location_ids (consulta indexada por location_id)"""
+    return Enterprise._get_collection().count_documents({'location_id': {'$in': list(location_ids)}})
+  
   @staticmethod
   def delete_location(location_id):
+    """
+    Elimina una ubicación junto con todo su subárbol (provincias y distritos) en
+    un número fijo de operaciones: un $graphLookup, el conteo de empresas que la
+    usan y un solo delete_many. No elimina nada si alguna empresa la referencia.
+    Returns:
+      tuple: (cantidad de ubicaciones eliminadas, error)
+    """
+    try:
+      subtree = Location.get_subtree(location_id)
+      if not subtree:
+        return 0, "Ubicación no encontrada"
+      root, descendants = subtree
+      ids = [root['_id']] + [row['_id'] for row in descendants]
+      in_use = LocationService.count_enterprises_using(ids)
+      if in_use:
+        return 0, f"No se puede eliminar: {in_use} empresa(s) usan esta ubicación o una de sus subdivisiones"
+      # 'ancestors' también alcanza a hijos creados después del $graphLookup
+      result = Location._get_collection().delete_many(
+        {'$or': [{'_id': {'$in': ids}}, {'ancestors': root['_id']}]}
+      )
+      for deleted_id in ids:
+        IdentityMap.discard(Location, deleted_id)
+      LocationService._tree_changed()
+      return result.deleted_count, None
+    except Exception as e:
+      return 0, str(e)
+  
+  @staticmethod
+  def move_location(location_id, parent_id):
+    """
+    Cambia el padre de una provincia o distrito y recalcula los campos
+    materializados de todo su subárbol con un solo bulk_write
+    Returns:
+      tuple: (ubicación actualizada, error)
+    """
     try:
       location = LocationService.get_location_by_id(location_id)
-      if location:
-        location.delete()
-        return True, None
-      return False, "Ubicación no encontrada"
+      if not location:
+        return None, "Ubicación no encontrada"
+      if location.type == 'department':
+        return None, "Un departamento no puede tener padre"
+      valid, error = LocationService.validate_parent_child_relationship(parent_id, location.type)
+      if not parent_id or not valid:
+        return None, error or "Parent no encontrado"
+      parent = LocationService.get_location_by_id(parent_id)
+      
+      subtree = Location.get_subtree(location.id)
+      if not subtree:
+        return None, "Ubicación no encontrada"
+      root, descendants = subtree
+      
+      # Los descendientes vienen ordenados por profundidad: su padre ya está calculado
+      resolved = {parent.id: parent.to_materialized_parent()}
+      root['parent_id'] = parent.id
+      operations = []
+      for row in [root] + descendants:
+        fields = Location.build_materialized(row['name'], row['type'], resolved.get(row['parent_id']))
+        resolved[row['_id']] = dict(fields, _id=row['_id'], name=row['name'])
+        update = dict(fields, parent_id=parent.id) if row is root else fields
+        operations.append(UpdateOne({'_id': row['_id']}, {'$set': update}))
+      Location._get_collection().bulk_write(operations, ordered=False)
+      LocationService._refresh_enterprise_labels(location.id)
+      
+      for moved_id in resolved:
+        IdentityMap.discard(Location, moved_id)
+      LocationService._tree_changed()
+      return LocationService.get_location_by_id(location.id), None
     except Exception as e:
-      return False, str(e)
+      return None, str(e)
+  
+  @staticmethod
+  def _refresh_enterprise_labels(location_id):
+    """
+    Actualiza Enterprise.location_label de las empresas ubicadas en la ubicación o
+    en sus distritos descendientes: una lectura de las rutas y un solo bulk_write
+    """
+    districts = Location._get_collection().find(
+      {'$or': [{'_id': location_id}, {'ancestors': location_id}], 'type': 'district'},
+      {'path': 1}
+    )
+    operations = [
+      UpdateMany({'location_id': row['_id']}, {'$set': {'location_label': row.get('path')}})
+      for row in districts
+    ]
+    if operations:
+      Enterprise._get_collection().bulk_write(operations, ordered=False)
+  
+  @staticmethod
+  def refresh_tree_caches():
+    """
+    Invalida los índices en memoria de todos los procesos y regenera en el acto el
+    árbol binario compartido y el snapshot estático. Para los comandos que
+    escriben directamente en la colección locations; los errores se propagan
+    """
+    LocationIndex.invalidate()
+    with LocationSnapshot.build_lock():
+      LocationSharedTree.build()
+      LocationSnapshot.build()
+  
+  @staticmethod
+  def _tree_changed():
+    """
+    Tras cada escritura desde la web solo se incrementa el sello del árbol (una
+    operación en MongoDB); el árbol binario y el snapshot no se regeneran dentro
+    de la petición. LocationSharedTree.get y LocationSnapshot.get_manifest
+    comparan la versión de sus archivos con el sello y los regeneran en la primera
+    lectura con la nueva versión, un solo proceso a la vez; si eso falla, la
+    lectura lo reporta (o consulta MongoDB) en vez de servir el árbol anterior
+    """
+    LocationIndex.invalidate()
+  
+  @staticmethod
+  def _descendant_name_field(location_type):
+    """Campo materializado que guardan los descendientes con el nombre de este tipo"""
+    return {
+      'department': 'department_name',
+      'province': 'province_name'
+    }.get(location_type)
   
   @staticmethod
   def validate_parent_child_relationship(parent_id, child_type):
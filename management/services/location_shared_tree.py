@@ -0,0 +1,395 @@
+# management/services/location_shared_tree.py
+import logging
+import mmap
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from bson import ObjectId
+from management.models.location import Location
+from management.models.version_stamp import VersionStamp
+from management.services.location_search import (
+  LocationSearchEngine, district_entries, district_result, index_tables, names_key
+)
+from management.services.location_snapshot import LocationSnapshot
+
+logger = logging.getLogger(__name__)
+
+FILE_NAME = 'locations.tree.bin'
+MAGIC = b'LOCTREE3'
+# Secciones del archivo en orden, cada una alineada a 8 bytes. Las tablas de textos
+# ordenados se guardan como offsets (n + 1) más los bytes UTF-8 concatenados
+SECTIONS = (
+  # Registros de tamaño fijo ordenados por ObjectId y nombres UTF-8
+  'records', 'names',
+  # Distritos del buscador: registro de cada uno y largo de su nombre
+  'districts', 'name_lengths',
+  # Vocabulario ordenado y, por palabra, los distritos donde aparece con su mejor campo
+  'token_offsets', 'token_text', 'posting_offsets', 'posting_districts', 'posting_fields',
+  # Trigramas ordenados y, por trigrama, las posiciones de las palabras que lo contienen
+  'trigram_offsets', 'trigram_text', 'trigram_token_offsets', 'trigram_tokens',
+  # Códigos UBIGEO ordenados y el distrito de cada uno
+  'ubigeo_codes', 'ubigeo_districts',
+  # Claves 'distrito\x1fprovincia\x1fdepartamento' normalizadas, ordenadas, y su distrito
+  'name_key_offsets', 'name_key_text', 'name_key_districts',
+)
+# Tipo de los arreglos (orden de bytes nativo: el archivo se genera y se lee en la misma máquina)
+SECTION_TYPES = {
+  'name_lengths': 'H', 'posting_fields': 'B',
+  'districts': 'I', 'token_offsets': 'I', 'posting_offsets': 'I', 'posting_districts': 'I',
+  'trigram_offsets': 'I', 'trigram_token_offsets': 'I', 'trigram_tokens': 'I',
+  'ubigeo_codes': 'I', 'ubigeo_districts': 'I', 'name_key_offsets': 'I', 'name_key_districts': 'I',
+}
+# magic, versión del árbol, cantidad de registros y (offset, largo) de cada sección
+HEADER = struct.Struct('<8sQI' + 'II' * len(SECTIONS))
+# ObjectId, índice del padre (-1 si no tiene), tipo, largo y offset del nombre, UBIGEO (0 si no tiene)
+RECORD = struct.Struct('<12siBxHII')
+NAME_KEY_SEPARATOR = '\x1f'
+
+TYPE_CODES = {'department': 1, 'province': 2, 'district': 3}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+def string_table(values):
+  """
+  Returns:
+    tuple: (offsets de cada texto, con el final del último, bytes UTF-8 concatenados)
+  """
+  offsets = array('I', [0])
+  text = bytearray()
+  for value in values:
+    text += value.encode('utf-8')
+    offsets.append(len(text))
+  return offsets, bytes(text)
+
+class MappedStrings:
+  """Tabla de textos ordenados en el mapa; admite bisect sin decodificar la tabla"""
+
+  def __init__(self, offsets, text):
+    self._offsets = offsets
+    self._text = text
+
+  def __len__(self):
+    return len(self._offsets) - 1
+
+  def __getitem__(self, index):
+    if not 0 <= index < len(self):
+      raise IndexError(index)
+    return str(self._text[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+
+  def find(self, value):
+    """Posición de value (búsqueda binaria) o None"""
+    index = bisect_left(self, value)
+    if index < len(self) and self[index] == value:
+      return index
+    return None
+
+class MappedRanges:
+  """Rebanadas de values por posición, según una tabla de offsets (n + 1)"""
+
+  def __init__(self, offsets, *values):
+    self._offsets = offsets
+    self._values = values
+
+  def __getitem__(self, index):
+    start, end = self._offsets[index], self._offsets[index + 1]
+    return tuple(values[start:end] for values in self._values)
+
+class MappedTrigrams:
+  """Trigrama -> posiciones en el vocabulario, con la interfaz de dict.get"""
+
+  def __init__(self, trigrams, positions):
+    self._trigrams = trigrams
+    self._positions = positions
+
+  def get(self, trigram, default=None):
+    index = self._trigrams.find(trigram)
+    if index is None:
+      return default
+    return self._positions[index][0]
+
+class MappedDistricts:
+  """Resultados del buscador por posición, construidos desde los registros del mapa"""
+
+  def __init__(self, tree, records):
+    self._tree = tree
+    self._records = records
+
+  def __len__(self):
+    return len(self._records)
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [self[i] for i in range(*index.indices(len(self)))]
+    return self._tree.district_entry(self._records[index])
+
+class MappedLocationTree:
+  """
+  Vista de solo lectura sobre el archivo mapeado en memoria. Los registros están
+  ordenados por ObjectId y el buscador, los códigos UBIGEO y los nombres se
+  resuelven con búsquedas binarias sobre las tablas del archivo: los arreglos son
+  memoryview del mapa, sin deserializar ni copiar nada por proceso.
+  """
+
+  def __init__(self, buffer):
+    header = HEADER.unpack_from(buffer, 0)
+    magic, version, count = header[:3]
+    if magic != MAGIC:
+      raise ValueError('Archivo de ubicaciones inválido')
+    view = memoryview(buffer)
+    sections = {}
+    for position, name in enumerate(SECTIONS):
+      offset, length = header[3 + 2 * position], header[4 + 2 * position]
+      section = view[offset:offset + length]
+      sections[name] = section.cast(SECTION_TYPES[name]) if name in SECTION_TYPES else section
+      if name == 'records':
+        self._records_offset = offset
+      elif name == 'names':
+        self._names_offset = offset
+    self._buffer = buffer
+    self.version = version
+    self.count = count
+
+    self._ubigeo_codes = sections['ubigeo_codes']
+    self._ubigeo_districts = sections['ubigeo_districts']
+    self._name_keys = MappedStrings(sections['name_key_offsets'], sections['name_key_text'])
+    self._name_key_districts = sections['name_key_districts']
+    self._districts = MappedDistricts(self, sections['districts'])
+    self.search_engine = LocationSearchEngine.from_tables(
+      self._districts,
+      MappedStrings(sections['token_offsets'], sections['token_text']),
+      MappedRanges(sections['posting_offsets'], sections['posting_districts'], sections['posting_fields']),
+      MappedTrigrams(
+        MappedStrings(sections['trigram_offsets'], sections['trigram_text']),
+        MappedRanges(sections['trigram_token_offsets'], sections['trigram_tokens'])
+      ),
+      sections['name_lengths']
+    )
+
+  def __len__(self):
+    return self.count
+
+  def _key(self, index):
+    offset = self._records_offset + index * RECORD.size
+    return self._buffer[offset:offset + 12]
+
+  def find(self, location_id):
+    """Índice del registro con ese ID (búsqueda binaria) o None"""
+    try:
+      target = ObjectId(location_id).binary
+    except Exception:
+      return None
+    low, high = 0, self.count
+    while low < high:
+      middle = (low + high) // 2
+      if self._key(middle) < target:
+        low = middle + 1
+      else:
+        high = middle
+    if low < self.count and self._key(low) == target:
+      return low
+    return None
+
+  def record(self, index):
+    """
+    Returns:
+      tuple: (ObjectId, índice del padre o None, tipo, nombre, UBIGEO o None)
+    """
+    raw_id, parent, type_code, name_length, name_offset, ubigeo = RECORD.unpack_from(
+      self._buffer, self._records_offset + index * RECORD.size
+    )
+    start = self._names_offset + name_offset
+    name = self._buffer[start:start + name_length].decode('utf-8')
+    return (
+      ObjectId(raw_id), (parent if parent >= 0 else None), TYPE_NAMES[type_code], name,
+      f'{ubigeo:06d}' if ubigeo else None
+    )
+
+  def district_entry(self, index):
+    """Resultado del buscador para el registro de un distrito con jerarquía completa"""
+    location_id, parent, _, name, _ = self.record(index)
+    _, grandparent, _, province_name, _ = self.record(parent)
+    return district_result(location_id, name, province_name, self.record(grandparent)[3])
+
+  def district_by_ubigeo(self, code):
+    """Distrito de un código UBIGEO de 6 dígitos (búsqueda binaria) o None"""
+    if not (code.isascii() and code.isdigit()):
+      return None
+    value = int(code)
+    index = bisect_left(self._ubigeo_codes, value)
+    if index < len(self._ubigeo_codes) and self._ubigeo_codes[index] == value:
+      return self._districts[self._ubigeo_districts[index]]
+    return None
+
+  def district_by_names(self, key):
+    """Distrito por la clave normalizada de names_key (búsqueda binaria) o None"""
+    index = self._name_keys.find(NAME_KEY_SEPARATOR.join(key))
+    if index is None:
+      return None
+    return self._districts[self._name_key_districts[index]]
+
+  def district_result(self, district_id):
+    """Distrito con su jerarquía, con la misma forma que Location.district_result"""
+    index = self.find(district_id)
+    if index is None:
+      return None
+    location_id, parent, location_type, name, _ = self.record(index)
+    if location_type != 'district':
+      return None
+    province_name = department_name = None
+    if parent is not None:
+      _, grandparent, _, province_name, _ = self.record(parent)
+      if grandparent is not None:
+        department_name = self.record(grandparent)[3]
+    return Location.district_result({
+      '_id': location_id,
+      'name': name,
+      'province_name': province_name,
+      'path': Location.build_path(name, 'district', province_name, department_name),
+    })
+
+class LocationSharedTree:
+  """
+  Árbol de ubicaciones en un archivo binario compacto que todos los workers
+  mapean en memoria (mmap de solo lectura), así el sistema operativo comparte
+  una sola copia. Lo regenera el primer proceso que lo lee después de un cambio
+  del sello del árbol y se reemplaza de forma atómica; los demás procesos
+  vuelven a mapearlo al ver la nueva versión.
+  """
+  _lock = threading.Lock()
+  _mapped = None
+  _failed_version = None
+
+  @staticmethod
+  def path():
+    return LocationSnapshot.directory() / FILE_NAME
+
+  @staticmethod
+  def serialize(rows, version):
+    """
+    Returns:
+      bytes: Cabecera y las secciones de SECTIONS (registros, nombres y tablas de búsqueda)
+    """
+    rows = sorted(rows, key=lambda row: row['_id'].binary)
+    index_by_id = {row['_id']: i for i, row in enumerate(rows)}
+    names = bytearray()
+    records = bytearray()
+    for row in rows:
+      name = row['name'].encode('utf-8')
+      parent = index_by_id.get(row.get('parent_id'), -1)
+      records += RECORD.pack(
+        row['_id'].binary, parent, TYPE_CODES[row['type']], len(name), len(names),
+        int(row.get('ubigeo') or 0)
+      )
+      names += name
+
+    # Las posiciones de los distritos son las del buscador (LocationSearchEngine)
+    districts = district_entries(rows)
+    tokens, postings, trigram_positions, name_lengths = index_tables(districts)
+    position_by_id = {result['district_id']: position for position, (result, _) in enumerate(districts)}
+    ubigeo = {
+      int(row['ubigeo']): position_by_id[str(row['_id'])]
+      for row in rows
+      if row.get('ubigeo') and str(row['_id']) in position_by_id
+    }
+    name_keys = {
+      NAME_KEY_SEPARATOR.join(names_key(result['name'], result['province_name'], department_name)): position
+      for position, (result, department_name) in enumerate(districts)
+    }
+
+    token_offsets, token_text = string_table(tokens)
+    posting_offsets, posting_districts, posting_fields = array('I', [0]), array('I'), array('B')
+    for keys, fields in postings:
+      posting_districts.extend(keys)
+      posting_fields.extend(fields)
+      posting_offsets.append(len(posting_districts))
+    trigram_list = sorted(trigram_positions)
+    trigram_offsets, trigram_text = string_table(trigram_list)
+    trigram_token_offsets, trigram_tokens = array('I', [0]), array('I')
+    for trigram in trigram_list:
+      trigram_tokens.extend(trigram_positions[trigram])
+      trigram_token_offsets.append(len(trigram_tokens))
+    name_key_list = sorted(name_keys)
+    name_key_offsets, name_key_text = string_table(name_key_list)
+
+    sections = {
+      'records': records,
+      'names': names,
+      'districts': array('I', (index_by_id[ObjectId(result['district_id'])] for result, _ in districts)),
+      'name_lengths': name_lengths,
+      'token_offsets': token_offsets,
+      'token_text': token_text,
+      'posting_offsets': posting_offsets,
+      'posting_districts': posting_districts,
+      'posting_fields': posting_fields,
+      'trigram_offsets': trigram_offsets,
+      'trigram_text': trigram_text,
+      'trigram_token_offsets': trigram_token_offsets,
+      'trigram_tokens': trigram_tokens,
+      'ubigeo_codes': array('I', sorted(ubigeo)),
+      'ubigeo_districts': array('I', (ubigeo[code] for code in sorted(ubigeo))),
+      'name_key_offsets': name_key_offsets,
+      'name_key_text': name_key_text,
+      'name_key_districts': array('I', (name_keys[key] for key in name_key_list)),
+    }
+    body = bytearray(HEADER.size)
+    table = []
+    for name in SECTIONS:
+      body += bytes(-len(body) % 8)
+      content = sections[name]
+      content = content.tobytes() if isinstance(content, array) else bytes(content)
+      table += [len(body), len(content)]
+      body += content
+    HEADER.pack_into(body, 0, MAGIC, version, len(rows), *table)
+    return bytes(body)
+
+  @classmethod
+  def build(cls):
+    """Regenera el archivo desde la colección locations"""
+    version = VersionStamp.location_tree()[0]
+    rows = Location._get_collection().find({}, {'name': 1, 'type': 1, 'parent_id': 1, 'ubigeo': 1})
+    LocationSnapshot.directory().mkdir(parents=True, exist_ok=True)
+    LocationSnapshot.write_atomic(cls.path(), cls.serialize(rows, version))
+
+  @classmethod
+  def _map_file(cls):
+    try:
+      with open(cls.path(), 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return MappedLocationTree(buffer)
+    except (OSError, ValueError, struct.error):
+      return None
+
+  @classmethod
+  def get(cls):
+    """
+    Árbol mapeado vigente; lo vuelve a mapear o regenerar si quedó atrás de la versión
+    Returns:
+      MappedLocationTree: o None si el archivo no está disponible
+    """
+    version = VersionStamp.location_tree()[0]
+    mapped = cls._mapped
+    if mapped is not None and mapped.version >= version:
+      return mapped
+    if cls._failed_version == version:
+      return None
+    with cls._lock:
+      mapped = cls._mapped
+      if mapped is not None and mapped.version >= version:
+        return mapped
+      try:
+        mapped = cls._map_file()
+        if mapped is None or mapped.version < version:
+          with LocationSnapshot.build_lock():
+            # Otro proceso pudo regenerarlo mientras se esperaba el candado
+            mapped = cls._map_file()
+            if mapped is None or mapped.version < version:
+              cls.build()
+              mapped = cls._map_file()
+      except Exception:
+        logger.exception('No se pudo mapear el árbol de ubicaciones')
+        mapped = None
+      # Sin archivo no se reintenta hasta que cambie la versión del árbol
+      cls._failed_version = None if mapped is not None else version
+      # El mapa anterior se libera cuando ningún hilo lo referencia
+      cls._mapped = mapped
+      return mapped
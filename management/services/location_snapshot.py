@@ -0,0 +1,178 @@
+# management/services/location_snapshot.py
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from django.conf import settings
+from management.models.location import Location
+from management.models.version_stamp import VersionStamp
+
+try:
+  import brotli
+except ImportError:  # brotli es opcional: sin él solo se genera la versión gzip
+  brotli = None
+
+try:
+  import fcntl
+except ImportError:  # fcntl solo existe en POSIX: sin él cada proceso regenera por su cuenta
+  fcntl = None
+
+MANIFEST_NAME = 'locations.manifest.json'
+LOCK_NAME = '.build.lock'
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{16}$')
+
+class LocationSnapshot:
+  """
+  Archivo estático con todo el árbol departamento/provincia/distrito para que el
+  autocompletado filtre en el navegador. El nombre lleva el hash del contenido
+  (se puede cachear como inmutable) y se guarda precomprimido en gzip y brotli.
+  """
+
+  @staticmethod
+  def directory():
+    return Path(settings.LOCATIONS_SNAPSHOT_DIR)
+
+  @staticmethod
+  def serialize(rows, version):
+    """
+    Serializa el árbol en listas compactas; cada hijo guarda el índice de su padre
+    Returns:
+      bytes: JSON UTF-8 {version, departments: [[id, name]],
+             provinces: [[id, name, department_idx]], districts: [[id, name, province_idx]]}
+    """
+    rows = list(rows)
+    departments = [row for row in rows if row['type'] == 'department']
+    department_index = {row['_id']: i for i, row in enumerate(departments)}
+    provinces = [
+      row for row in rows
+      if row['type'] == 'province' and row.get('parent_id') in department_index
+    ]
+    province_index = {row['_id']: i for i, row in enumerate(provinces)}
+    districts = [
+      row for row in rows
+      if row['type'] == 'district' and row.get('parent_id') in province_index
+    ]
+    payload = {
+      'version': version,
+      'departments': [[str(row['_id']), row['name']] for row in departments],
+      'provinces': [
+        [str(row['_id']), row['name'], department_index[row['parent_id']]] for row in provinces
+      ],
+      'districts': [
+        [str(row['_id']), row['name'], province_index[row['parent_id']]] for row in districts
+      ],
+    }
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+  @staticmethod
+  def write_atomic(path, content):
+    """Escritura atómica: archivo temporal en el mismo directorio y os.replace"""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        f.write(content)
+      os.chmod(tmp_path, 0o644)
+      os.replace(tmp_path, path)
+    except Exception:
+      if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+      raise
+
+  @classmethod
+  @contextmanager
+  def build_lock(cls):
+    """
+    Candado entre procesos (flock sobre un archivo del directorio) para que, tras
+    un cambio de versión, un solo worker regenere los archivos del árbol y los
+    demás esperen y usen su resultado
+    """
+    directory = cls.directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+      yield
+      return
+    with open(directory / LOCK_NAME, 'a') as f:
+      fcntl.flock(f, fcntl.LOCK_EX)
+      try:
+        yield
+      finally:
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+  @classmethod
+  def read_manifest(cls):
+    try:
+      with open(cls.directory() / MANIFEST_NAME, 'rb') as f:
+        return json.loads(f.read())
+    except (OSError, ValueError):
+      return None
+
+  @classmethod
+  def build(cls):
+    """
+    Regenera el archivo del árbol desde la colección locations
+    Returns:
+      dict: Manifiesto {version, hash, file}
+    """
+    version = VersionStamp.location_tree()[0]
+    rows = Location._get_collection().find({}, {'name': 1, 'type': 1, 'parent_id': 1})
+    body = cls.serialize(rows, version)
+    digest = hashlib.sha256(body).hexdigest()[:16]
+
+    directory = cls.directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = cls.read_manifest()
+
+    name = f'locations.{digest}.json'
+    cls.write_atomic(directory / name, body)
+    cls.write_atomic(directory / f'{name}.gz', gzip.compress(body, compresslevel=9, mtime=0))
+    if brotli:
+      cls.write_atomic(directory / f'{name}.br', brotli.compress(body, quality=11))
+
+    manifest = {'version': version, 'hash': digest, 'file': name}
+    cls.write_atomic(directory / MANIFEST_NAME, json.dumps(manifest).encode('utf-8'))
+
+    # Se conserva también el snapshot anterior para clientes que aún lo descargan
+    keep = {digest, previous.get('hash') if previous else None}
+    for path in directory.glob('locations.*.json*'):
+      if path.name != MANIFEST_NAME and path.name.split('.')[1] not in keep:
+        path.unlink(missing_ok=True)
+    return manifest
+
+  @classmethod
+  def get_manifest(cls):
+    """Manifiesto vigente; se regenera si no existe o si el árbol cambió"""
+    version = VersionStamp.location_tree()[0]
+    manifest = cls.read_manifest()
+    if manifest and manifest.get('version', -1) >= version:
+      return manifest
+    with cls.build_lock():
+      # Otro proceso pudo regenerarlo mientras se esperaba el candado
+      manifest = cls.read_manifest()
+      if not manifest or manifest.get('version', -1) < version:
+        manifest = cls.build()
+    return manifest
+
+  @classmethod
+  def find_file(cls, digest, accept_encoding=''):
+    """
+    Busca el archivo de un snapshot con la mejor codificación aceptada por el cliente
+    Returns:
+      tuple: (ruta, codificación o None) o None si no existe
+    """
+    if not DIGEST_PATTERN.match(digest or ''):
+      return None
+    accepted = {
+      part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')
+    }
+    path = cls.directory() / f'locations.{digest}.json'
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+      encoded = path.with_name(path.name + suffix)
+      if encoding in accepted and encoded.exists():
+        return encoded, encoding
+    if path.exists():
+      return path, None
+    return None
@@ -1,15 +1,31 @@
 # management/services/role_service.py
 from bson import ObjectId
-from mongoengine.queryset import Q
 from mongoengine.errors import DoesNotExist
 from datetime import datetime
-import math
+from main.counting import count_documents, invalidate_counts
+from main.identity_map import IdentityMap
+from main.pagination import paginate
+from main.search import search_filter
 from management.models.role import Role
+from management.models.list_rows import RoleRow
 
 class RoleService:
+  EXPORT_FIELDS = (
+    ('_id', 'id'), ('name', 'nombre'), ('description', 'descripcion'),
+    ('created', 'creado'), ('updated', 'actualizado'),
+  )
+
+  @staticmethod
+  def filter_roles(search_query=''):
+    """Consulta de roles con los filtros del listado"""
+    roles = Role.objects.all()
+    name_filter = search_filter(search_query)
+    if name_filter:
+      roles = roles.filter(__raw__=name_filter)
+    return roles
   
   @staticmethod
-  def get_roles_list(page_number=1, per_page=10, search_query=''):
+  def get_roles_list(page_number=1, per_page=10, search_query='', after='', before='', last=False):
     """Obtener lista paginada de roles con filtros"""
     try:
       page_number = int(page_number)
@@ -23,35 +39,36 @@ class RoleService:
     if per_page < 1:
       per_page = 10
 
-    roles = Role.objects.all()
-    
-    if search_query:
-      roles = roles.filter(Q(name__icontains=search_query))
+    roles = RoleService.filter_roles(search_query)
 
-    total_roles = roles.count()
-    total_pages = math.ceil(total_roles / per_page)
-    
-    offset = (page_number - 1) * per_page
-    paginated_roles = roles.skip(offset).limit(per_page)
+    total_roles, exact = count_documents(roles)
+    page = paginate(
+      roles, total_roles, page_number, per_page, after, before, last, exact, RoleRow
+    )
 
     return {
-      'roles': paginated_roles,
+      'roles': page['items'],
       'total_roles': total_roles,
-      'total_pages': total_pages,
-      'page_number': page_number,
+      'total_exact': exact,
+      'total_pages': page['total_pages'],
+      'page_number': page['page_number'],
       'per_page': per_page,
-      'offset': offset
+      'offset': page['offset'],
+      'previous': page['previous'],
+      'next': page['next']
     }
   
   @staticmethod
   def get_role_by_id(role_id):
     """Obtener rol por ID"""
-    try:
-      return Role.objects.get(id=ObjectId(role_id))
-    except Role.DoesNotExist:
-      return None
-    except Exception:
-      return None
+    def load():
+      try:
+        return Role.objects.get(id=ObjectId(role_id))
+      except Role.DoesNotExist:
+        return None
+      except Exception:
+        return None
+    return IdentityMap.load(Role, role_id, load)
   
   @staticmethod
   def create_role(name, description):
@@ -59,6 +76,7 @@ class RoleService:
     try:
       role = Role(name=name, description=description)
       role.save()
+      invalidate_counts(Role)
       return role, None
     except Exception as e:
       return None, str(e)
@@ -74,6 +92,7 @@ class RoleService:
       role.name = name
       role.description = description
       role.save()
+      invalidate_counts(Role)
       
       return role, None
     except Exception as e:
@@ -89,6 +108,8 @@ class RoleService:
       
       role_name = role.name
       role.delete()
+      invalidate_counts(Role)
+      IdentityMap.discard(Role, role_id)
       return True, role_name
     except Exception as e:
       return False, str(e)
\ No newline at end of file
@@ -1,14 +1,29 @@
 # management/services/tag_service.py
 from datetime import datetime
 from bson import ObjectId
-from mongoengine.queryset import Q
+from main.counting import count_documents, invalidate_counts
+from main.identity_map import IdentityMap
+from main.pagination import paginate
+from main.search import search_filter
 from management.models.tag import Tag
-import math
+from management.models.list_rows import TagRow
 
 class TagService:
+  EXPORT_FIELDS = (
+    ('_id', 'id'), ('name', 'nombre'), ('created', 'creado'), ('updated', 'actualizado'),
+  )
+
+  @staticmethod
+  def filter_tags(search_query=''):
+    """Consulta de tags con los filtros del listado"""
+    tags = Tag.objects.all()
+    name_filter = search_filter(search_query)
+    if name_filter:
+      tags = tags.filter(__raw__=name_filter)
+    return tags
   
   @staticmethod
-  def get_tags_list(page_number=1, per_page=10, search_query=''):
+  def get_tags_list(page_number=1, per_page=10, search_query='', after='', before='', last=False):
     """Obtener lista paginada de tags con filtros"""
     try:
       page_number = int(page_number)
@@ -22,35 +37,36 @@ class TagService:
     if per_page < 1:
       per_page = 10
 
-    tags = Tag.objects.all()
-    
-    if search_query:
-      tags = tags.filter(Q(name__icontains=search_query))
+    tags = TagService.filter_tags(search_query)
 
-    total_tags = tags.count()
-    total_pages = math.ceil(total_tags / per_page)
-    
-    offset = (page_number - 1) * per_page
-    paginated_tags = tags.skip(offset).limit(per_page)
+    total_tags, exact = count_documents(tags)
+    page = paginate(
+      tags, total_tags, page_number, per_page, after, before, last, exact, TagRow
+    )
 
     return {
-      'tags': paginated_tags,
+      'tags': page['items'],
       'total_tags': total_tags,
-      'total_pages': total_pages,
-      'page_number': page_number,
+      'total_exact': exact,
+      'total_pages': page['total_pages'],
+      'page_number': page['page_number'],
       'per_page': per_page,
-      'offset': offset
+      'offset': page['offset'],
+      'previous': page['previous'],
+      'next': page['next']
     }
   
   @staticmethod
   def get_tag_by_id(tag_id):
     """Obtener tag por ID"""
-    try:
-      return Tag.objects.get(id=ObjectId(tag_id))
-    except Tag.DoesNotExist:
-      return None
-    except Exception:
-      return None
+    def load():
+      try:
+        return Tag.objects.get(id=ObjectId(tag_id))
+      except Tag.DoesNotExist:
+        return None
+      except Exception:
+        return None
+    return IdentityMap.load(Tag, tag_id, load)
   
   @staticmethod
   def create_tag(name):
@@ -58,6 +74,7 @@ class TagService:
     try:
       tag = Tag(name=name)
       tag.save()
+      invalidate_counts(Tag)
       return tag, None
     except Exception as e:
       return None, str(e)
@@ -73,6 +90,7 @@ class TagService:
       tag.name = name
       tag.updated = datetime.utcnow()
       tag.save()
+      invalidate_counts(Tag)
       
       return tag, None
     except Exception as e:
@@ -88,6 +106,8 @@ class TagService:
       
       tag_name = tag.name
       tag.delete()
+      invalidate_counts(Tag)
+      IdentityMap.discard(Tag, tag_id)
       return True, tag_name
     except Exception as e:
       return False, str(e)
\ No newline at end of file
@@ -1,3 +1,78 @@
-from django.test import TestCase
+import os
+from unittest import skipUnless
+from django.test import SimpleTestCase
+from mongoengine import connect, disconnect
+from mongoengine.connection import DEFAULT_CONNECTION_NAME, get_db
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from management.models.enterprise import Enterprise
 
-# Create your tests here.
+def mongo_available():
+  try:
+    MongoClient(os.getenv('MONGO_HOST'), serverSelectionTimeoutMS=1000).admin.command('ping')
+    return True
+  except PyMongoError:
+    return False
+
+# mongoengine no crea una base de pruebas como el ORM de Django: las pruebas que
+# escriben (índices incluidos) usan esta base aparte y la eliminan al terminar
+TEST_DB_ALIAS = 'test'
+TEST_DB_NAME = f"test_{os.getenv('MONGO_DB_NAME') or 'tickets'}"
+
+def plan_stages(plan):
+  """Recorre el plan ganador de explain() y devuelve todas sus etapas"""
+  stages = [plan]
+  for key in ('inputStage', 'queryPlan'):
+    if key in plan:
+      stages += plan_stages(plan[key])
+  for child in plan.get('inputStages', []):
+    stages += plan_stages(child)
+  return stages
+
+class EnterpriseTaxIdQueryTest(SimpleTestCase):
+
+  def test_exact_match_with_eleven_digits(self):
+    self.assertEqual(Enterprise.tax_id_query('20123456789'), {'tax_id': '20123456789'})
+
+  def test_anchored_prefix_range(self):
+    self.assertEqual(Enterprise.tax_id_query('2012'), {'tax_id': {'$gte': '2012', '$lt': '2013'}})
+    self.assertEqual(Enterprise.tax_id_query('209'), {'tax_id': {'$gte': '209', '$lt': '20:'}})
+
+  def test_non_numeric_input_is_not_routed_to_the_index(self):
+    self.assertIsNone(Enterprise.tax_id_query('abc'))
+    self.assertIsNone(Enterprise.tax_id_query(''))
+
+@skipUnless(mongo_available(), 'MongoDB no disponible')
+class EnterpriseTaxIdExplainTest(SimpleTestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    super().setUpClass()
+    connect(db=TEST_DB_NAME, host=os.getenv('MONGO_HOST'), alias=TEST_DB_ALIAS)
+    # Como switch_db, pero sin abrir antes la colección de la base configurada
+    cls.db_alias = Enterprise._meta.get('db_alias', DEFAULT_CONNECTION_NAME)
+    Enterprise._meta['db_alias'] = TEST_DB_ALIAS
+    Enterprise._collection = None
+    Enterprise.ensure_indexes()
+
+  @classmethod
+  def tearDownClass(cls):
+    Enterprise._meta['db_alias'] = cls.db_alias
+    Enterprise._collection = None
+    get_db(TEST_DB_ALIAS).client.drop_database(TEST_DB_NAME)
+    disconnect(TEST_DB_ALIAS)
+    super().tearDownClass()
+
+  def assert_uses_tax_id_index(self, query):
+    explain = Enterprise._get_collection().find(query).explain()
+    stages = plan_stages(explain['queryPlanner']['winningPlan'])
+    index_scans = [stage for stage in stages if stage.get('stage') == 'IXSCAN']
+    self.assertTrue(index_scans, f'Se esperaba IXSCAN: {stages}')
+    self.assertEqual(index_scans[0]['keyPattern'], {'tax_id': 1})
+    self.assertNotIn('COLLSCAN', [stage.get('stage') for stage in stages])
+
+  def test_exact_ruc_uses_index(self):
+    self.assert_uses_tax_id_index(Enterprise.tax_id_query('20123456789'))
+
+  def test_prefix_ruc_uses_index(self):
+    self.assert_uses_tax_id_index(Enterprise.tax_id_query('2012'))
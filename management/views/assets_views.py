@@ -2,7 +2,11 @@
 from django.http import JsonResponse
 from django.shortcuts import redirect, render
 from django.contrib import messages
+from main.counting import count_label
+from main.export import export_response
+from main.pagination import page_links
 from management.services.asset_service import AssetService
+from management.services.enterprise_service import EnterpriseService
 from management.forms.assets_forms import AssetForm
 from management.forms.documents_forms import AssetDocumentForm
 
@@ -14,7 +18,10 @@ def assets_list(request):
   search_query = request.GET.get('name', '')
   code_query = request.GET.get('code', '')
 
-  result = AssetService.get_assets_list(page_number, per_page, search_query, code_query)
+  result = AssetService.get_assets_list(
+    page_number, per_page, search_query, code_query,
+    request.GET.get('after', ''), request.GET.get('before', ''), bool(request.GET.get('last'))
+  )
   
   context = {
     'nav_link': nav_link,
@@ -27,11 +34,27 @@ def assets_list(request):
     'total_assets': result['total_assets'],
     'total_pages': result['total_pages'],
     'start_record': result['offset'] + 1,
-    'end_record': min(result['offset'] + result['per_page'], result['total_assets']),
+    'end_record': result['offset'] + len(result['assets']),
+    'total_exact': result['total_exact'],
+    'total_label': count_label(result['total_assets'], result['total_exact']),
+    'page_links': page_links(result, {'per_page': result['per_page'], 'name': search_query, 'code': code_query}),
   }
 
   return render(request, 'management/assets/list.html', context)
 
+def assets_export(request):
+  # Mismos filtros que el listado; las filas se envían en streaming sin paginar
+  response = export_response(
+    AssetService.filter_assets(request.GET.get('name', ''), request.GET.get('code', '')),
+    AssetService.EXPORT_FIELDS,
+    request.GET.get('format', 'csv'),
+    'activos'
+  )
+  if response is None:
+    messages.error(request, 'Formato de exportación no soportado (use csv o ndjson).')
+    return redirect('assets_list')
+  return response
+
 def delete_asset(request, asset_id):
   if request.method == 'GET':
     success, result = AssetService.delete_asset(asset_id)
@@ -113,6 +136,7 @@ def update_asset(request, asset_id):
     'editing': True,
     'form': form,
     'asset': asset,
+    'enterprises': EnterpriseService.get_assets_memberships([asset.id]).get(str(asset.id), []),
     'page_title': 'Editar Activo',
     'nav_link': nav_link, 
   }
@@ -129,7 +153,7 @@ def asset_add_document(request, asset_id):
     form = AssetDocumentForm(request.POST)
     
     if form.is_valid():
-      asset, error = AssetService.add_document_to_asset(
+      document, error = AssetService.add_document_to_asset(
         asset_id,
         form.cleaned_data['name'],
         form.cleaned_data['size'],
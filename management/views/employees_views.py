@@ -2,7 +2,11 @@
 from django.http import JsonResponse
 from django.shortcuts import redirect, render
 from django.contrib import messages
+from main.counting import count_label
+from main.export import export_response
+from main.pagination import page_links
 from management.services.employee_service import EmployeeService
+from management.services.enterprise_service import EnterpriseService
 from management.forms.employees_forms import EmployeeForm
 
 nav_link = 'employees'
@@ -13,7 +17,10 @@ def employees_list(request):
   search_query = request.GET.get('name', '')
   email_query = request.GET.get('email', '')
 
-  result = EmployeeService.get_employees_list(page_number, per_page, search_query, email_query)
+  result = EmployeeService.get_employees_list(
+    page_number, per_page, search_query, email_query,
+    request.GET.get('after', ''), request.GET.get('before', ''), bool(request.GET.get('last'))
+  )
   
   context = {
     'nav_link': nav_link,
@@ -26,11 +33,27 @@ def employees_list(request):
     'total_employees': result['total_employees'],
     'total_pages': result['total_pages'],
     'start_record': result['offset'] + 1,
-    'end_record': min(result['offset'] + result['per_page'], result['total_employees']),
+    'end_record': result['offset'] + len(result['employees']),
+    'total_exact': result['total_exact'],
+    'total_label': count_label(result['total_employees'], result['total_exact']),
+    'page_links': page_links(result, {'per_page': result['per_page'], 'name': search_query, 'email': email_query}),
   }
 
   return render(request, 'management/employees/list.html', context)
 
+def employees_export(request):
+  # Mismos filtros que el listado; las filas se envían en streaming sin paginar
+  response = export_response(
+    EmployeeService.filter_employees(request.GET.get('name', ''), request.GET.get('email', '')),
+    EmployeeService.EXPORT_FIELDS,
+    request.GET.get('format', 'csv'),
+    'empleados'
+  )
+  if response is None:
+    messages.error(request, 'Formato de exportación no soportado (use csv o ndjson).')
+    return redirect('employees_list')
+  return response
+
 def delete_employee(request, employee_id):
   if request.method == 'GET':
     success, result = EmployeeService.delete_employee(employee_id)
@@ -127,6 +150,7 @@ def update_employee(request, employee_id):
     'editing': True,
     'form': form,
     'employee': employee,
+    'enterprises': EnterpriseService.get_employees_memberships([employee.id]).get(str(employee.id), []),
     'page_title': 'Editar Empleado',
     'nav_link': nav_link, 
   }
@@ -3,7 +3,11 @@ import json
 from django.http import JsonResponse
 from django.shortcuts import redirect, render
 from django.contrib import messages
+from main.counting import count_label
+from main.export import export_response
+from main.pagination import page_links
 from management.services.enterprise_service import EnterpriseService
+from management.services.enterprise_import_service import EnterpriseImportService
 from management.forms.enterprises_forms import EnterpriseForm
 
 nav_link = 'enterprises'
@@ -14,7 +18,10 @@ def enterprises_list(request):
   search_query = request.GET.get('name', '')
   tax_id_query = request.GET.get('tax_id', '')
 
-  result = EnterpriseService.get_enterprises_list(page_number, per_page, search_query, tax_id_query)
+  result = EnterpriseService.get_enterprises_list(
+    page_number, per_page, search_query, tax_id_query,
+    request.GET.get('after', ''), request.GET.get('before', ''), bool(request.GET.get('last'))
+  )
   
   context = {
     'nav_link': nav_link,
@@ -27,11 +34,27 @@ def enterprises_list(request):
     'total_enterprises': result['total_enterprises'],
     'total_pages': result['total_pages'],
     'start_record': result['offset'] + 1,
-    'end_record': min(result['offset'] + result['per_page'], result['total_enterprises']),
+    'end_record': result['offset'] + len(result['enterprises']),
+    'total_exact': result['total_exact'],
+    'total_label': count_label(result['total_enterprises'], result['total_exact']),
+    'page_links': page_links(result, {'per_page': result['per_page'], 'name': search_query, 'tax_id': tax_id_query}),
   }
 
   return render(request, 'management/enterprises/list.html', context)
 
+def enterprises_export(request):
+  # Mismos filtros que el listado; las filas se envían en streaming sin paginar
+  response = export_response(
+    EnterpriseService.filter_enterprises(request.GET.get('name', ''), request.GET.get('tax_id', '')),
+    EnterpriseService.EXPORT_FIELDS,
+    request.GET.get('format', 'csv'),
+    'empresas'
+  )
+  if response is None:
+    messages.error(request, 'Formato de exportación no soportado (use csv o ndjson).')
+    return redirect('enterprises_list')
+  return response
+
 def delete_enterprise(request, enterprise_id):
   if request.method == 'GET':
     success, result = EnterpriseService.delete_enterprise(enterprise_id)
@@ -45,6 +68,31 @@ def delete_enterprise(request, enterprise_id):
   else:
     return redirect('enterprises_list')
 
+def import_enterprises(request):
+  context = {
+    'nav_link': nav_link,
+    'page_title': 'Importar Empresas',
+  }
+
+  if request.method == 'POST':
+    uploaded_file = request.FILES.get('file')
+    if not uploaded_file:
+      messages.error(request, 'Seleccione un archivo CSV o XLSX')
+      return render(request, 'management/enterprises/import.html', context, status=400)
+
+    report, error = EnterpriseImportService.import_file(uploaded_file)
+    if error:
+      messages.error(request, f'Error al importar: {error}')
+      return render(request, 'management/enterprises/import.html', context, status=400)
+
+    if report['failed']:
+      messages.warning(request, f"{report['inserted']} empresas importadas, {report['failed']} filas con errores")
+    else:
+      messages.success(request, f"{report['inserted']} empresas importadas correctamente")
+    context['report'] = report
+
+  return render(request, 'management/enterprises/import.html', context)
+
 def create_enterprise(request):
   context = {"nav_link": nav_link}
   
@@ -144,10 +192,20 @@ def employees_enterprise(request, enterprise_id):
   if request.method == 'POST':
     try:
       data = json.loads(request.body)
-      success, error = EnterpriseService.update_enterprise_employees(enterprise_id, data['employees'])
+      if 'filter' in data:
+        # "Seleccionar todos los resultados": el servidor resuelve las coincidencias
+        result, error = EnterpriseService.update_matching_employees(
+          enterprise_id, data['filter'], bool(data.get('selected', True)), data.get('version')
+        )
+      else:
+        result, error = EnterpriseService.update_enterprise_employees(
+          enterprise_id, data['employees'], data.get('version')
+        )
       
-      if success:
-        return JsonResponse({'message': f'Empleados asociados a la empresa', 'status': 'success'}, status=200)
+      if result:
+        return JsonResponse({'message': f'Empleados asociados a la empresa', 'status': 'success', **result}, status=200)
+      elif error == EnterpriseService.VERSION_CONFLICT:
+        return JsonResponse({'error': error, 'message': 'Error al asociar empleados'}, status=409)
       else:
         return JsonResponse({'error': error, 'message': 'Error al asociar empleados'}, status=500)
     except Exception as e:
@@ -181,6 +239,7 @@ def employees_enterprise(request, enterprise_id):
       'start_record': result['offset'] + 1,
       'end_record': min(result['offset'] + result['per_page'], result['total_employees']),
       'enterprise_id': enterprise_id,
+      'version': result['version'],
     }
 
     return render(request, 'management/enterprises/employees.html', context)
@@ -189,10 +248,20 @@ def assets_enterprise(request, enterprise_id):
   if request.method == 'POST':
     try:
       data = json.loads(request.body)
-      success, error = EnterpriseService.update_enterprise_assets(enterprise_id, data['assets'])
+      if 'filter' in data:
+        # "Seleccionar todos los resultados": el servidor resuelve las coincidencias
+        result, error = EnterpriseService.update_matching_assets(
+          enterprise_id, data['filter'], bool(data.get('selected', True)), data.get('version')
+        )
+      else:
+        result, error = EnterpriseService.update_enterprise_assets(
+          enterprise_id, data['assets'], data.get('version')
+        )
       
-      if success:
-        return JsonResponse({'message': f'Activos asociados a la empresa', 'status': 'success'}, status=200)
+      if result:
+        return JsonResponse({'message': f'Activos asociados a la empresa', 'status': 'success', **result}, status=200)
+      elif error == EnterpriseService.VERSION_CONFLICT:
+        return JsonResponse({'error': error, 'message': 'Error al asociar activos'}, status=409)
       else:
         return JsonResponse({'error': error, 'message': 'Error al asociar activos'}, status=500)
     except Exception as e:
@@ -226,6 +295,7 @@ def assets_enterprise(request, enterprise_id):
       'start_record': result['offset'] + 1,
       'end_record': min(result['offset'] + result['per_page'], result['total_assets']),
       'enterprise_id': enterprise_id,
+      'version': result['version'],
     }
 
     return render(request, 'management/enterprises/assets.html', context)
\ No newline at end of file
@@ -120,9 +120,11 @@ def departments_edit(request, department_id):
   })
 
 def departments_delete(request, department_id):
-  success, error = LocationService.delete_location(department_id)
+  deleted, error = LocationService.delete_location(department_id)
   if error:
     messages.error(request, f'Error: {error}')
+  elif deleted > 1:
+    messages.success(request, f'Departamento eliminado junto con {deleted - 1} provincias y distritos')
   else:
     messages.success(request, 'Departamento eliminado')
   return redirect('locations')
@@ -205,9 +207,11 @@ def provinces_edit(request, department_id, province_id):
   })
 
 def provinces_delete(request, department_id, province_id):
-  success, error = LocationService.delete_location(province_id)
+  deleted, error = LocationService.delete_location(province_id)
   if error:
     messages.error(request, f'Error: {error}')
+  elif deleted > 1:
+    messages.success(request, f'Provincia eliminada junto con {deleted - 1} distritos')
   else:
     messages.success(request, 'Provincia eliminada')
   return redirect('locations_provinces', department_id=department_id)
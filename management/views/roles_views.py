@@ -3,81 +3,65 @@ from bson import ObjectId
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib import messages
-from mongoengine.queryset import Q # Usa esta importación
+from main.counting import count_label, invalidate_counts
+from main.export import export_response
+from main.pagination import page_links
 from management.forms.roles_forms import RoleForm
 from management.models.role import Role
-import math
+from management.services.role_service import RoleService
 
 from management.models.location import Location
 
 nav_link = 'roles'
 
 def roles_list(request):
-  # Obtener parámetros de la URL
   page_number = request.GET.get('page', 1)
   per_page = request.GET.get('per_page', 10)
   search_query = request.GET.get('name', '')
 
-  # Validar y convertir a enteros
-  try:
-    page_number = int(page_number)
-    per_page = int(per_page)
-  except (ValueError, TypeError):
-    page_number = 1
-    per_page = 10
-  
-  # Validar que no sean valores negativos o cero
-  if page_number < 1:
-    page_number = 1
-  if per_page < 1:
-    per_page = 10
-
-  # Consultar y filtrar El rols
-  roles = Role.objects.all()
-  # Construir una lista de consultas Q para combinar
-  query_list = []
-  if search_query:
-    query_list.append(Q(name__icontains=search_query))
-  
-
-  if query_list:
-    # Combinar todas las consultas con AND
-    combined_query = query_list[0]
-    for q in query_list[1:]:
-      combined_query &= q
-    roles = roles.filter(combined_query)
-
-  # Lógica de paginación
-  total_roles = roles.count()
-  total_pages = math.ceil(total_roles / per_page)
-  
-  # Calcular el offset para la consulta (skip)
-  offset = (page_number - 1) * per_page
-  
-  # Obtener El rols para la página actual
-  paginated_roles = roles.skip(offset).limit(per_page)
+  result = RoleService.get_roles_list(
+    page_number, per_page, search_query,
+    request.GET.get('after', ''), request.GET.get('before', ''), bool(request.GET.get('last'))
+  )
 
   context = {
     'nav_link': nav_link,
     'page_title': 'Gestión de Roles',
-    'roles': paginated_roles,
+    'roles': result['roles'],
     'search_query': search_query,
-    'page': page_number,
-    'per_page': per_page,
-    'total_roles': total_roles,
-    'total_pages': total_pages,
-    'start_record': offset + 1,
-    'end_record': min(offset + per_page, total_roles),
+    'page': result['page_number'],
+    'per_page': result['per_page'],
+    'total_roles': result['total_roles'],
+    'total_pages': result['total_pages'],
+    'start_record': result['offset'] + 1,
+    'end_record': result['offset'] + len(result['roles']),
+    'total_exact': result['total_exact'],
+    'total_label': count_label(result['total_roles'], result['total_exact']),
+    'page_links': page_links(result, {'per_page': result['per_page'], 'name': search_query}),
   }
 
   return render(request, 'management/roles/list.html', context)
 
+def roles_export(request):
+  # Mismos filtros que el listado; las filas se envían en streaming sin paginar
+  response = export_response(
+    RoleService.filter_roles(request.GET.get('name', '')),
+    RoleService.EXPORT_FIELDS,
+    request.GET.get('format', 'csv'),
+    'roles'
+  )
+  if response is None:
+    messages.error(request, 'Formato de exportación no soportado (use csv o ndjson).')
+    return redirect('roles_list')
+  return response
+
 def delete_role(request, role_id):
   if request.method == 'GET':
     try:
       # Usamos el ObjectId para encontrar el documento
       role = Role.objects.get(id=ObjectId(role_id))
       role.delete()
+      invalidate_counts(Role)
       messages.success(request, f'El rol "{role.name}" ha sido eliminada correctamente.')
     except role.DoesNotExist:
       messages.error(request, 'El rol no fue encontrada.')
@@ -108,6 +92,7 @@ def create_role(request):
         
         # Save to MongoDB
         role.save()
+        invalidate_counts(Role)
 
         # Success message and redirect
         messages.success(request,'¡Rol creado exitosamente!')
@@ -159,6 +144,7 @@ def update_role(request, role_id):
       
       # 4. Guardar los cambios en la base de datos
       role.save() 
+      invalidate_counts(Role)
       
       messages.success(request, f'El rol "{role.name}" ha sido actualizadaocorrectamente.')
     else:
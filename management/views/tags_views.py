@@ -2,6 +2,9 @@
 from django.http import JsonResponse
 from django.shortcuts import redirect, render
 from django.contrib import messages
+from main.counting import count_label
+from main.export import export_response
+from main.pagination import page_links
 from management.services.tag_service import TagService
 from management.forms.tags_forms import TagForm
 
@@ -12,7 +15,10 @@ def tags_list(request):
   per_page = request.GET.get('per_page', 10)
   search_query = request.GET.get('name', '')
 
-  result = TagService.get_tags_list(page_number, per_page, search_query)
+  result = TagService.get_tags_list(
+    page_number, per_page, search_query,
+    request.GET.get('after', ''), request.GET.get('before', ''), bool(request.GET.get('last'))
+  )
   
   context = {
     'nav_link': nav_link,
@@ -24,11 +30,27 @@ def tags_list(request):
     'total_tags': result['total_tags'],
     'total_pages': result['total_pages'],
     'start_record': result['offset'] + 1,
-    'end_record': min(result['offset'] + result['per_page'], result['total_tags']),
+    'end_record': result['offset'] + len(result['tags']),
+    'total_exact': result['total_exact'],
+    'total_label': count_label(result['total_tags'], result['total_exact']),
+    'page_links': page_links(result, {'per_page': result['per_page'], 'name': search_query}),
   }
 
   return render(request, 'management/tags/list.html', context)
 
+def tags_export(request):
+  # Mismos filtros que el listado; las filas se envían en streaming sin paginar
+  response = export_response(
+    TagService.filter_tags(request.GET.get('name', '')),
+    TagService.EXPORT_FIELDS,
+    request.GET.get('format', 'csv'),
+    'tags'
+  )
+  if response is None:
+    messages.error(request, 'Formato de exportación no soportado (use csv o ndjson).')
+    return redirect('tags_list')
+  return response
+
 def delete_tag(request, tag_id):
   if request.method == 'GET':
     success, result = TagService.delete_tag(tag_id)
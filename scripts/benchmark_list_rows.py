@@ -0,0 +1,107 @@
+"""
+Compara el costo por fila de los listados: Document de mongoengine (documento
+completo, como antes) frente a AssetRow (__slots__ sobre un dict proyectado).
+
+Uso:
+    python scripts/benchmark_list_rows.py            # filas sintéticas, sin MongoDB
+    python scripts/benchmark_list_rows.py --live     # lee la colección assets real
+
+En modo sintético cada activo tiene una descripción de 2,000 caracteres y
+--documents archivos embebidos; el camino AssetRow recibe solo los campos que
+proyecta el servidor (id, code, name, created).
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from management.models.asset import Asset  # noqa: E402
+from management.models.list_rows import AssetRow  # noqa: E402
+
+def generar_filas(n, documentos):
+    ahora = datetime.utcnow()
+    filas = []
+    for i in range(n):
+        filas.append({
+            '_id': ObjectId(),
+            'name': f'Servidor Web {i}',
+            'code': f'ACT-{i:08d}',
+            'description': 'x' * 2000,
+            'documents': [
+                {
+                    '_id': ObjectId(),
+                    'name': f'manual-{j}.pdf',
+                    'size': 1024 * j,
+                    'mime': 'application/pdf',
+                    'url': f'/uploads/assets/manual-{j}.pdf',
+                    'created': ahora,
+                }
+                for j in range(documentos)
+            ],
+            'created': ahora - timedelta(seconds=i),
+            'updated': ahora,
+        })
+    return filas
+
+def proyectar(filas):
+    campos = ('_id',) + tuple(campo for campo in AssetRow.__slots__ if campo != 'id')
+    return [{campo: fila[campo] for campo in campos} for fila in filas]
+
+def medir(nombre, construir, filas):
+    """Tiempo por fila y memoria retenida por la lista de filas construidas"""
+    inicio = time.perf_counter()
+    construir(filas)
+    segundos = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    resultado = construir(filas)
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+
+    print(
+        f'{nombre:<22} {segundos * 1e6 / len(filas):>10.2f} µs/fila '
+        f'{memoria / len(filas):>10.0f} B/fila'
+    )
+
+def sintetico(n, documentos):
+    completas = generar_filas(n, documentos)
+    proyectadas = proyectar(completas)
+    print(f'{n} filas sintéticas, {documentos} documentos embebidos por activo')
+    # _from_son es lo que hace mongoengine con cada documento al iterar un QuerySet
+    medir('Document (completo)', lambda filas: [Asset._from_son(fila) for fila in filas], completas)
+    medir('AssetRow (proyectado)', lambda filas: [AssetRow(fila) for fila in filas], proyectadas)
+
+def en_vivo(n):
+    print(f'Hasta {n} activos de la colección {Asset._get_collection_name()}')
+
+    def documentos(_):
+        return list(Asset.objects.order_by('-created', '-id').limit(n))
+
+    def filas(_):
+        queryset = Asset.objects.order_by('-created', '-id').limit(n)
+        return [AssetRow(fila) for fila in queryset.only(*AssetRow.__slots__).as_pymongo()]
+
+    total = len(documentos(None)) or 1
+    medir('Document (completo)', lambda _: documentos(_), range(total))
+    medir('AssetRow (proyectado)', lambda _: filas(_), range(total))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--documents', type=int, default=5)
+    parser.add_argument('--live', action='store_true', help='Medir contra MongoDB (incluye la red)')
+    args = parser.parse_args()
+    if args.live:
+        en_vivo(args.rows)
+    else:
+        sintetico(args.rows, args.documents)
@@ -11,6 +11,9 @@
  * @param {string} [config.valueKey='id'] - Campo a guardar como valor seleccionado
  * @param {string} [config.emptyMessage='No se encontraron resultados'] - Mensaje para resultados vacíos
  * @param {number} [config.debounceTime=300] - Tiempo de espera después de escribir (ms)
+ * @param {string} [config.snapshotUrl] - URL del manifiesto del snapshot de ubicaciones; si se indica,
+ *   se filtra en el navegador y solo se consulta apiUrl cuando no hay coincidencias locales
+ * @param {number} [config.localLimit=10] - Máximo de sugerencias del filtrado local
  */
 export class AutoComplete {
   constructor(config) {
@@ -32,6 +35,7 @@ export class AutoComplete {
       valueKey: 'id',
       emptyMessage: 'No se encontraron resultados',
       debounceTime: 300,
+      localLimit: 10,
       ...config
     };
 
@@ -51,9 +55,14 @@ export class AutoComplete {
     this.activeIndex = -1;
     this.currentSuggestions = [];
     this.lastRequest = null;
+    this.localItems = null;
 
     // Inicializar eventos
     this.initEvents();
+
+    if (this.config.snapshotUrl) {
+      this.loadSnapshot();
+    }
   }
 
   // Métodos públicos
@@ -95,6 +104,19 @@ export class AutoComplete {
       return;
     }
 
+    // Filtrado local con el snapshot; la API solo atiende lo que no se encuentre
+    if (this.localItems) {
+      const localResults = this.searchLocal(query);
+      if (localResults.length > 0) {
+        if (this.lastRequest) {
+          this.lastRequest.abort();
+        }
+        this.currentSuggestions = localResults;
+        this.renderSuggestions();
+        return;
+      }
+    }
+
     try {
       // Cancelar petición anterior si existe
       if (this.lastRequest) {
@@ -135,6 +157,60 @@ export class AutoComplete {
     }
   }
 
+  async loadSnapshot() {
+    try {
+      const manifestResponse = await fetch(this.config.snapshotUrl);
+      if (!manifestResponse.ok) throw new Error(`Error HTTP: ${manifestResponse.status}`);
+      const manifest = (await manifestResponse.json()).data;
+
+      const treeUrl = new URL(manifest.url, new URL(this.config.snapshotUrl, window.location.href));
+      const treeResponse = await fetch(treeUrl);
+      if (!treeResponse.ok) throw new Error(`Error HTTP: ${treeResponse.status}`);
+
+      this.localItems = AutoComplete.flattenTree(await treeResponse.json());
+    } catch (error) {
+      console.warn('AutoComplete: snapshot no disponible, se usará la búsqueda remota', error);
+      this.localItems = null;
+    }
+  }
+
+  searchLocal(query) {
+    const words = AutoComplete.normalize(query).split(/[^\p{L}\p{N}]+/u).filter(Boolean);
+    if (words.length === 0) return [];
+
+    const matches = this.localItems.filter(item => words.every(word => item.searchKey.includes(word)));
+
+    // Primero los distritos cuyo nombre empieza con la primera palabra, luego los más cortos
+    const first = words[0];
+    matches.sort((a, b) =>
+      (b.districtKey.startsWith(first) - a.districtKey.startsWith(first)) ||
+      (a.name.length - b.name.length)
+    );
+
+    return matches.slice(0, this.config.localLimit).map(({ searchKey, districtKey, ...item }) => item);
+  }
+
+  static normalize(text) {
+    return text.normalize('NFD').replace(/[\u0300-\u036f]/g, '').toLowerCase().trim();
+  }
+
+  static flattenTree(tree) {
+    return tree.districts.map(([districtId, name, provinceIndex]) => {
+      const [, provinceName, departmentIndex] = tree.provinces[provinceIndex];
+      const departmentName = tree.departments[departmentIndex][1];
+      const fullName = `${name}, ${provinceName}, ${departmentName}`;
+      return {
+        district_id: districtId,
+        name: name,
+        province_name: provinceName,
+        district_name: name,
+        full_name: fullName,
+        searchKey: AutoComplete.normalize(fullName),
+        districtKey: AutoComplete.normalize(name)
+      };
+    });
+  }
+
   renderSuggestions() {
     this.suggestionsDiv.innerHTML = '';
 